@@ -0,0 +1,110 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+from util.const import Const
+from util.data import JsonUtil
+from util.offers import OfferTable
+
+
+def parse_job(spec: str) -> tuple[str, datetime.date]:
+    ''' @return tuple[str, datetime.date] - (json file, notice date or `None` for the default)
+    of a job given as `FILE` or `FILE@YYYY-MM-DD`
+    '''
+    src, sep, date = spec.rpartition('@')
+    if not sep or not date: return spec, None
+    try:
+        return src, datetime.date.fromisoformat(date)
+    except ValueError:
+        return spec, None  # `@` is part of the file name
+
+
+def submit(args: argparse.Namespace) -> int:
+    ''' @return int - exit code, 0 if all offers succeeded\n
+    Run login -> prune -> submit for json files, all of them in one run sharing workers and connections.
+    '''
+    from util.job import SubmitJob
+    from util.request import RequestUtil
+
+    jobs = []
+    for spec in args.files:
+        src, date = parse_job(spec)
+        offset = (datetime.date.today() - (date or args.date)).days
+        if offset < 0:
+            print(f'[{src}] cannot submit offers from future', file=sys.stderr)
+            return 2
+        try:
+            jobs.append(SubmitJob(OfferTable.load(src), RequestUtil.make_notice_date(offset), src))
+        except ValueError as ex:
+            print(f'[{src}] is invalid: {ex}', file=sys.stderr)
+            return 2
+
+    req = RequestUtil(args.config)
+    req.new_log.connect(lambda log: None if args.quiet and log.endswith(' - SUCCESS') else print(log))
+    msg = req.login()
+    if msg:
+        print(msg, file=sys.stderr)
+        return 1
+    req.add_jobs(jobs)
+    print(f'Run report is saved into [{req.save_report(", ".join(args.files), jobs[0].notice_date)}]')
+    all_failed = [fail for job in jobs for fail in job.failed]
+    if not all_failed:
+        print('* All Succeeded *')
+        return 0
+    print(f'* Totally {len(all_failed)} fail(s):')
+    for job in jobs:
+        for fail in job.failed:
+            print(f'{job}: {fail}' if len(jobs) > 1 else fail)
+    return 1
+
+
+def convert(args: argparse.Namespace) -> int:
+    ''' @return int - exit code, 0 if all files are converted\n
+    Convert txt files in parallel, then save a summary under `assets/report`.
+    '''
+    division = JsonUtil.load(args.division) if os.path.isfile(args.division) else json.loads(args.division)
+    summary = JsonUtil.convert_batch(args.sources, division, args.output, args.workers)
+    for item in summary['succeeded']:
+        print(f'[{item["src"]}] -> [{item["dst"]}]: {item["msg"]}')
+    for item in summary['failed']:
+        print(f'[{item["src"]}] failed: {item["error"]}', file=sys.stderr)
+    os.makedirs(Const.DIR_REPORT, exist_ok=True)
+    path = os.path.join(Const.DIR_REPORT, time.strftime('convert_%Y%m%d_%H%M%S.json'))
+    JsonUtil.save(path, summary, False)
+    print(f'{len(summary["succeeded"])} converted, {len(summary["failed"])} failed, summary is saved into [{path}]')
+    return 1 if summary['failed'] else 0
+
+
+def main() -> int:
+    ''' @return int - exit code\n
+    Headless entry, without Qt.
+    '''
+    parser = argparse.ArgumentParser(description='Convert or submit offers without GUI.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sub = commands.add_parser('submit', help='submit offers in converted json files')
+    sub.add_argument('files', nargs='+', help='converted json files of offers, FILE@YYYY-MM-DD to set its own date')
+    sub.add_argument('-d', '--date', type=datetime.date.fromisoformat, default=datetime.date.today(),
+                     help='notice date as YYYY-MM-DD of files without their own, today by default')
+    sub.add_argument('-c', '--config', default=Const.FILE_JSON_USER_CONF, help='user and common config')
+    sub.add_argument('-q', '--quiet', action='store_true', help='do not print a line per succeeded bank')
+    sub.set_defaults(func=submit)
+
+    sub = commands.add_parser('convert', help='convert txt files to json files in parallel')
+    sub.add_argument('sources', nargs='+', help='txt files, directories of txt files or glob patterns')
+    sub.add_argument('--division', required=True,
+                     help='json file or json text, a 4x5 division for all files, or {file name: division} '
+                          'where key "*" is the default')
+    sub.add_argument('-o', '--output', default='', help='dir of json files, beside txt files by default')
+    sub.add_argument('-w', '--workers', type=int, help='number of processes, all cores by default')
+    sub.set_defaults(func=convert)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+''' Throughput benchmark of `RequestUtil` against a local `MockServer`.
+
+Usage: python test/bench_request.py [--sizes 100 1000 10000] [--latency 0.01] [--comm '{"maxWorkers": 8}']
+'''
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_server import serve  # noqa: E402
+
+from util.const import Const  # noqa: E402
+from util.data import JsonUtil  # noqa: E402
+
+
+def make_banks(count: int) -> list[list[str]]:
+    ''' @return list[list[str]] - synthetic offers in the layout of converted json files
+    '''
+    banks = []
+    for i in range(count):
+        values = [f'{random.uniform(1.5, 3.5):.2f}' if random.random() < 0.6 else '' for _ in range(5)]
+        if not any(values): values[0] = '2.00'
+        banks.append([f'测试银行{i:05d}', *values])
+    return banks
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def run_one(workdir: str, count: int, comm: dict, measure_memory: bool) -> dict:
+    ''' @return dict - metrics of submitting `count` synthetic banks once, in a fresh working dir
+    '''
+    os.chdir(workdir)
+    for path in [Const.FILE_JSON_BANK_CACHE, Const.FILE_JSON_SNAPSHOT, Const.FILE_JSON_JOURNAL]:
+        if os.path.exists(path): os.remove(path)
+    JsonUtil.save(Const.FILE_JSON_USER_CONF, [{Const.CONF_USERNAME: 'bench'}, {**Const.DEFAULT_COMM, **comm}])
+    from util.request import RequestUtil
+
+    banks = make_banks(count)
+    offers = sum(1 for bank in banks for val in bank[1:] if val)
+    latencies = []
+    req = RequestUtil()
+    record = req.metrics.request  # called by both engines for every trial, unlike hooks of `requests`
+
+    def on_request(endpoint: str, latency: float, *args) -> None:
+        latencies.append(latency)
+        record(endpoint, latency, *args)
+
+    req.metrics.request = on_request
+    if measure_memory: tracemalloc.start()
+    start = time.perf_counter()
+    req.login()
+    failed = req.add_offers(banks, 1000 * int(time.time()))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if measure_memory else 0
+    if measure_memory: tracemalloc.stop()
+    return {
+        'banks': count,
+        'offers': offers,
+        'failed': len(failed),
+        'seconds': round(elapsed, 3),
+        'offersPerSec': round(offers / elapsed, 1),
+        'requests': len(latencies),
+        'p50Ms': round(1000 * percentile(latencies, 50), 2),
+        'p99Ms': round(1000 * percentile(latencies, 99), 2),
+        'peakMemMiB': round(peak / 2**20, 2)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark RequestUtil against a local mock server.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='numbers of banks')
+    parser.add_argument('--latency', type=float, default=0.005, help='server latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.005, help='extra random server latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='ratio of requests answered with 503')
+    parser.add_argument('--rate-limit', type=int, default=0, help='max requests per second, 0 for no limit')
+    parser.add_argument('--comm', type=json.loads, default={}, help='common config overrides, as json')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace peak memory (it slows runs down)')
+    parser.add_argument('--output', help='also save results as json')
+    args = parser.parse_args()
+
+    comm = {Const.CONF_MULTI_THREAD: True, Const.CONF_MAX_WORKERS: 8, **args.comm}
+    workdir = tempfile.mkdtemp(prefix='as-bench-')
+    shutil.copytree(os.path.join(ROOT, 'assets'), os.path.join(workdir, 'assets'))
+    conf = JsonUtil.load(os.path.join(ROOT, Const.FILE_JSON_URL_RULE))
+    origin = mp.Queue()
+    kwargs = {'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate, 'rate_limit': args.rate_limit}
+    server = mp.Process(target=serve, args=(dict(conf), origin), kwargs=kwargs, daemon=True)
+    server.start()
+    conf['Origin'] = origin.get(timeout=10)
+    conf['Host'] = conf['Origin'].split('//')[1]
+    JsonUtil.save(os.path.join(workdir, Const.FILE_JSON_URL_RULE), conf)
+
+    results = []
+    try:
+        for count in args.sizes:
+            results.append(run_one(workdir, count, comm, not args.no_memory))
+            print(json.dumps(results[-1]))
+    finally:
+        server.terminate()
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.output: JsonUtil.save(args.output, {'comm': comm, 'server': vars(args), 'results': results}, False)
+
+
+if __name__ == '__main__':
+    main()
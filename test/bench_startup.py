@@ -0,0 +1,102 @@
+''' Startup benchmark of the GUI entry point, each trial runs in a fresh interpreter.
+
+Reports time to import `ui.main` and time from start to the first paint of `MainWindow`,
+also time to import `util.request` (what the headless `cli.py` pays before its first request).
+
+Usage: python test/bench_startup.py [--trials 10] [--output startup.json]
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child_gui() -> dict:
+    ''' @return dict - seconds spent to import `ui.main` and to paint the main window once
+    '''
+    start = time.perf_counter()
+    from PySide2.QtCore import QEvent, QObject, QTimer
+
+    from ui.main import MainWindow
+    imported = time.perf_counter()
+
+    class PaintWatcher(QObject):
+        def __init__(self) -> None:
+            super().__init__()
+            self.painted = None
+
+        def eventFilter(self, obj: QObject, event: QEvent) -> bool:
+            if event.type() == QEvent.Paint and self.painted is None:
+                self.painted = time.perf_counter()
+                QTimer.singleShot(0, window.app.quit)
+            return False
+
+    window = MainWindow()
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    window.set_attributes()
+    window.set_handlers()
+    window.set_init_values()
+    window.show()
+    QTimer.singleShot(10000, window.app.quit)  # in case nothing is ever painted
+    window.app.exec_()
+    return {'importSec': imported - start, 'firstPaintSec': (watcher.painted or float('nan')) - start}
+
+
+def child_headless() -> dict:
+    ''' @return dict - seconds spent to import `util.request`
+    '''
+    start = time.perf_counter()
+    import util.request  # noqa: F401
+    return {'importSec': time.perf_counter() - start}
+
+
+def run_trial(target: str) -> dict:
+    ''' @return dict - result of one trial of `target`, run in a new process
+    '''
+    env = {**os.environ, 'QT_QPA_PLATFORM': os.environ.get('QT_QPA_PLATFORM', 'offscreen')}
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', target],
+                         cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def summarize(results: list[dict]) -> dict:
+    ''' @return dict - median and max milliseconds of each measured field
+    '''
+    summary = {}
+    for field in results[0]:
+        values = [1000 * result[field] for result in results]
+        summary[field.replace('Sec', 'MedianMs')] = round(statistics.median(values), 1)
+        summary[field.replace('Sec', 'MaxMs')] = round(max(values), 1)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark startup time of the GUI and of util.request.')
+    parser.add_argument('--trials', type=int, default=10, help='number of fresh processes per target')
+    parser.add_argument('--targets', nargs='+', default=['gui', 'headless'], choices=['gui', 'headless'])
+    parser.add_argument('--output', help='also save results as json')
+    parser.add_argument('--child', choices=['gui', 'headless'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(child_gui() if args.child == 'gui' else child_headless()))
+        return
+    results = {}
+    for target in args.targets:
+        run_trial(target)  # warm up disk caches and bytecode
+        results[target] = summarize([run_trial(target) for _ in range(args.trials)])
+        print(json.dumps({'target': target, 'trials': args.trials, **results[target]}))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
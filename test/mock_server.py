@@ -0,0 +1,176 @@
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Queue
+from threading import Event, Lock, Thread
+
+
+class MockServer:
+    ''' A local stand-in of endpoints in `url.json`: login, offerList, fuzzyQuery,
+    getRankById and addOffer. Every bank name is known, its issuer id and rank are
+    derived from the name. Accepted offers are kept and served by offerList.\n
+    `latency` (+ random `jitter`) seconds are spent on each request, `error_rate` of
+    requests get a 503, and requests beyond `rate_limit` per second (0 for no limit)
+    get a 503 as well. Requests other than login must carry a `lid` header issued by
+    login within `session_ttl` seconds (0 for no expiry), or they get a 401.
+    '''
+    RANKS = ['AAA', 'AA+', 'AA', 'AA-', 'A+', 'A', 'A-', 'BBB+']
+
+    def __init__(self, conf: dict, latency: float = 0, jitter: float = 0,
+                 error_rate: float = 0, rate_limit: int = 0, session_ttl: float = 0, port: int = 0) -> None:
+        self.routes = {'/' + conf[key]: key for key in ['login', 'offerList', 'fuzzyQuery', 'getRankById', 'addOffer']}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.session_ttl = session_ttl
+        self.sessions: dict[str, float] = {}  # session id -> time of login
+        self.lock = Lock()
+        self.stats: dict[str, int] = {key: 0 for key in self.routes.values()}
+        self.errors = 0
+        self.names: dict[str, str] = {}  # issuer id -> bank name
+        self.offers: dict[int, dict[str, list[str]]] = {}  # notice date -> issuer id -> offer values
+        self.window = [0, 0]  # [second, requests in it]
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self.__make_handler(), bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.request_queue_size = 128  # default 5 drops bursts of connects, which then wait ~1s to retry
+        self.server.server_bind()
+        self.server.server_activate()
+
+    @property
+    def origin(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self) -> 'MockServer':
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def issuer_id(bank_name: str) -> str:
+        return hashlib.md5(bank_name.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def rank_of(issuer_id: str) -> str:
+        return MockServer.RANKS[int(issuer_id, 16) % len(MockServer.RANKS)]
+
+    # endpoints
+    def login(self, payload: dict) -> dict:
+        session_id = self.issuer_id(f'{time.time()}{random.random()}')
+        with self.lock:
+            self.sessions[session_id] = time.time()
+        return {'status': '0', 'msg': '', 'data': {'sessionId': session_id}}
+
+    def fuzzy_query(self, payload: dict) -> dict:
+        name = payload['enqrVal']
+        with self.lock:
+            self.names[self.issuer_id(name)] = name
+        return {'data': {'list': [{'organizationShortName': name, 'issuerId': self.issuer_id(name)}]}}
+
+    def get_rank_by_id(self, payload: dict) -> dict:
+        return {'data': self.rank_of(payload['institutionId'])}
+
+    def add_offer(self, payload: dict) -> dict:
+        with self.lock:
+            offers = self.offers.setdefault(payload['noticeDate'], {})
+            for offer in payload['offerDtlList']:
+                offers.setdefault(offer['issuerId'], [''] * 5)[int(offer['issueTermNcd']) - 1] = offer['refYieldBulletin']
+        return {'msg': '新增报价成功'}
+
+    def offer_list(self, payload: dict) -> dict:
+        groups = {rank: [[] for _ in range(5)] for rank in self.RANKS}
+        with self.lock:
+            offers = dict(self.offers.get(payload['noticeDate'], {}))
+        for issuer_id, values in offers.items():
+            rank = self.rank_of(issuer_id)
+            if payload.get('sbjRtg') and payload['sbjRtg'] != rank: continue
+            for i, val in enumerate(values):
+                offer = {'organizationShortName': self.names.get(issuer_id, issuer_id), 'refYield': val}
+                if val: groups[rank][i].append(offer)
+        data = [{'sbjRtg': rank, 'sbjRtgList': [{'offerDtlList': x} for x in terms]} for rank, terms in groups.items()]
+        return {'data': data}
+
+    # helpers
+    def expire(self) -> None:
+        ''' @return None\n
+        Expire all session ids issued so far.
+        '''
+        with self.lock:
+            self.sessions.clear()
+
+    def is_valid(self, session_id: str) -> bool:
+        with self.lock:
+            issued = self.sessions.get(session_id)
+        return issued is not None and (self.session_ttl <= 0 or time.time() - issued < self.session_ttl)
+
+    def reject(self) -> bool:
+        ''' @return bool - `True` if this request gets an injected error or is rate limited
+        '''
+        with self.lock:
+            now = int(time.time())
+            if self.window[0] != now: self.window = [now, 0]
+            self.window[1] += 1
+            limited = self.rate_limit > 0 and self.window[1] > self.rate_limit
+            if limited or random.random() < self.error_rate:
+                self.errors += 1
+                return True
+        return False
+
+    def __make_handler(self) -> type:
+        mock = self
+        handlers = {
+            'login': self.login,
+            'offerList': self.offer_list,
+            'fuzzyQuery': self.fuzzy_query,
+            'getRankById': self.get_rank_by_id,
+            'addOffer': self.add_offer
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+            disable_nagle_algorithm = True  # headers and body are written separately
+
+            def do_POST(self) -> None:
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                key = mock.routes.get(self.path)
+                if key is None: return self.__send(404, b'')
+                with mock.lock:
+                    mock.stats[key] += 1
+                time.sleep(mock.latency + random.uniform(0, mock.jitter))
+                if mock.reject(): return self.__send(503, b'Service Unavailable')
+                if key != 'login' and not mock.is_valid(self.headers.get('lid')):
+                    body = {'status': '401', 'msg': '登录已过期，请重新登录'}
+                    return self.__send(401, json.dumps(body, ensure_ascii=False).encode('utf-8'))
+                body = json.dumps(handlers[key](payload), ensure_ascii=False).encode('utf-8')
+                self.__send(200, body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def __send(self, code: int, body: bytes) -> None:
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def serve(conf: dict, origin: Queue, **kwargs) -> None:
+    ''' @return None\n
+    Run a `MockServer` until the process is terminated, its origin is put into `origin`.
+    Used to host the server in another process, so it does not compete for the GIL.
+    '''
+    server = MockServer(conf, **kwargs).start()
+    origin.put(server.origin)
+    Event().wait()
+
+
+if __name__ == '__main__':
+    pass
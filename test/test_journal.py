@@ -0,0 +1,149 @@
+''' Replay of `SubmitJournal` by `pending`, and resuming an interrupted `RequestUtil.add_jobs`.
+'''
+import json
+import os
+import shutil
+
+import pytest
+from mock_server import MockServer
+from util.journal import SubmitJournal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOBS = [{'file': 'a.json', 'noticeDate': 1, 'total': 2}, {'file': 'b.json', 'noticeDate': 2, 'total': 2}]
+
+
+@pytest.fixture
+def journal(tmp_path) -> SubmitJournal:
+    return SubmitJournal(str(tmp_path / 'journal.jsonl'))
+
+
+def test_no_journal(journal: SubmitJournal) -> None:
+    assert journal.pending() is None
+
+
+def test_finished_run(journal: SubmitJournal) -> None:
+    journal.begin(JOBS)
+    journal.record(['a1', '2.1', '', '', '', ''], '新增报价成功', True, 0)
+    journal.end()
+    assert journal.pending() is None
+
+
+def test_interrupted_run(journal: SubmitJournal) -> None:
+    journal.begin(JOBS)
+    journal.record(['a1', '2.1', '', '', '', ''], '新增报价成功', True, 0)
+    journal.record(['a2', '2.1', '', '', '', ''], '请求失败', False, 0)  # failed banks are not done
+    journal.record(['b1', '2.1', '', '', '', ''], '新增报价成功', True, 1)
+    journal.close()
+    assert journal.pending() == [
+        {'file': 'a.json', 'noticeDate': 1, 'done': {'a1'}},
+        {'file': 'b.json', 'noticeDate': 2, 'done': {'b1'}}
+    ]
+
+
+def test_torn_line(journal: SubmitJournal) -> None:
+    journal.begin(JOBS)
+    journal.record(['a1', '2.1', '', '', '', ''], '新增报价成功', True, 0)
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "bank", "job": 1, "ba')  # crashed while writing
+    journal.begin(JOBS, resume=True)
+    journal.record(['b1', '2.1', '', '', '', ''], '新增报价成功', True, 1)
+    journal.close()
+    assert [job['done'] for job in journal.pending()] == [{'a1'}, {'b1'}]
+
+
+def test_job_index_across_resume(journal: SubmitJournal) -> None:
+    journal.begin(JOBS)
+    journal.record(['b1', '2.1', '', '', '', ''], '新增报价成功', True, 1)
+    journal.close()
+    journal.begin(JOBS[1:], resume=True)  # indices refer to jobs of the latest (re)start
+    journal.record(['b2', '2.1', '', '', '', ''], '新增报价成功', True, 0)
+    journal.close()
+    assert journal.pending() == [
+        {'file': 'a.json', 'noticeDate': 1, 'done': set()},
+        {'file': 'b.json', 'noticeDate': 2, 'done': {'b1', 'b2'}}
+    ]
+    journal.begin(JOBS[1:], resume=True)
+    journal.end()
+    assert journal.pending() is None
+
+
+def test_new_run_discards_old(journal: SubmitJournal) -> None:
+    journal.begin(JOBS)
+    journal.record(['a1', '2.1', '', '', '', ''], '新增报价成功', True, 0)
+    journal.close()
+    journal.begin(JOBS[1:])
+    journal.close()
+    assert journal.pending() == [{'file': 'b.json', 'noticeDate': 2, 'done': set()}]
+
+
+def test_journal_of_one_file(journal: SubmitJournal) -> None:
+    with open(journal.path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'type': 'begin', 'file': 'a.json', 'noticeDate': 1}) + '\n')
+        f.write(json.dumps({'type': 'bank', 'bank': ['a1', '2.1', '', '', '', ''], 'msg': '', 'ok': True}) + '\n')
+    assert journal.pending() == [{'file': 'a.json', 'noticeDate': 1, 'done': {'a1'}}]
+
+
+class Crash(Exception):
+    pass
+
+
+class RecordingServer(MockServer):
+    ''' Keep names of all submitted banks, in order.
+    '''
+    def __init__(self, conf: dict) -> None:
+        self.submitted: list[str] = []
+        super().__init__(conf)
+
+    def add_offer(self, payload: dict) -> dict:
+        with self.lock:
+            self.submitted.extend(self.names[offer['issuerId']] for offer in payload['offerDtlList'])
+        return super().add_offer(payload)
+
+
+def test_resume_interrupted_add_jobs(tmp_path, monkeypatch) -> None:
+    shutil.copytree(os.path.join(ROOT, 'assets'), tmp_path / 'assets')
+    monkeypatch.chdir(tmp_path)
+    with open('assets/json/url.json', 'r', encoding='utf-8') as f:
+        conf = json.load(f)
+    server = RecordingServer(conf).start()
+    conf['Origin'], conf['Host'] = server.origin, server.origin[len('http://'):]
+    comm = {'enableMultiThread': True, 'maxWorkers': 1, 'resolveWorkers': 1, 'rankWorkers': 1, 'retryTrials': 1}
+    with open('assets/json/url.json', 'w', encoding='utf-8') as f:
+        json.dump(conf, f)
+    with open('assets/json/user.json', 'w', encoding='utf-8') as f:
+        json.dump([{'loginName': 'a'}, comm], f)
+    with open('assets/json/bank_map.json', 'w', encoding='utf-8') as f:
+        json.dump({'测试': '测试银行0'}, f, ensure_ascii=False)  # a known name, `测试银千0` is corrected to it
+    from util.job import SubmitJob
+    from util.request import RequestUtil
+    rows = [['测试银千0', '2.1', '', '', '', '']] + [[f'测试银行{i}', '2.1', '', '', '', ''] for i in range(1, 20)]
+    notice_date = RequestUtil.make_notice_date()
+    try:
+        req = RequestUtil()
+        req.start_run()
+        assert not req.login()
+        count = [0]
+
+        def crash(log: str) -> None:
+            count[0] += log.endswith(' - SUCCESS')
+            if count[0] == 8: raise Crash()
+
+        req.new_log.connect(crash)
+        with pytest.raises(Crash):
+            req.add_jobs([SubmitJob(rows, notice_date, 'a.json')])
+        req.new_log.disconnect(crash)
+
+        pending = req.journal.pending()
+        assert len(pending) == 1 and pending[0]['file'] == 'a.json' and pending[0]['noticeDate'] == notice_date
+        done = pending[0]['done']
+        assert len(done) == 8 and '测试银千0' in done  # named as in the source file
+        req.start_run()
+        req.add_jobs([SubmitJob([row for row in rows if row[0] not in done], notice_date, 'a.json')], resume=True)
+        assert req.journal.pending() is None
+    finally:
+        server.stop()
+    names = ['测试银行0'] + [row[0] for row in rows[1:]]
+    assert set(server.submitted) == set(names)
+    for name in names:
+        if name in done or name == '测试银行0': assert server.submitted.count(name) == 1, name
@@ -0,0 +1,65 @@
+''' Behaviour of `BankNameIndex.correct`: only known misreadings are corrected.
+'''
+import json
+import os
+
+import pytest
+from util.names import BankNameIndex
+
+
+@pytest.fixture
+def index() -> BankNameIndex:
+    names = ['常州农商银行', '苏州农商银行', '江阴农商银行', '宁波银行', '招商银行股份有限公司']
+    return BankNameIndex(names, [('宇', '宁')])
+
+
+@pytest.mark.parametrize('name, known', [
+    ('常州农商银千', '常州农商银行'),  # 千→行 at the end
+    ('招商银千股份有限公司', '招商银行股份有限公司'),  # 千→行 in the middle
+    ('宇波银千', '宁波银行'),  # a learned pair and 千→行 in one name
+    ('宇波银行', '宁波银行'),
+])
+def test_correct_known_pairs(index: BankNameIndex, name: str, known: str) -> None:
+    assert index.correct(name) == known
+
+
+@pytest.mark.parametrize('name', [
+    '常州农商银行',  # known names are kept as they are
+    '江南农商银行',  # one char apart from 江阴农商银行, not a known misreading
+    '无锡农商银行',  # one char apart from 常州/苏州农商银行
+    '宁波银',  # shorter than a known name
+    '宁波银行行',  # longer than a known name
+    '行波银行',  # 行→宁 is not a known misreading
+    '',
+])
+def test_keep_other_names(index: BankNameIndex, name: str) -> None:
+    assert index.correct(name) == name
+
+
+def test_misread_is_one_way(index: BankNameIndex) -> None:
+    index.add('中千银行')
+    assert index.correct('中千银行') == '中千银行'  # known, though 千 is a misreading of 行
+    assert index.correct('中行银千') == '中行银千'  # 行→千 is not a misreading
+
+
+def test_ambiguous_candidates() -> None:
+    index = BankNameIndex(['中于银行', '中行银行'], [('千', '于')])
+    assert index.correct('中千银行') == '中千银行'  # both are misread as it
+    assert index.correct('中于银千') == '中于银行'
+
+
+def test_confused_chars_fold_transitively() -> None:
+    index = BankNameIndex(['丁丙银行'], [('甲', '乙'), ('乙', '丙')])
+    assert index.correct('丁乙银行') == '丁丙银行'
+    assert index.correct('丁甲银行') == '丁甲银行'  # (甲, 丙) is not a known pair itself
+
+
+def test_load_learns_single_char_pairs(tmp_path, monkeypatch) -> None:
+    os.makedirs(tmp_path / 'assets' / 'json')
+    with open(tmp_path / 'assets' / 'json' / 'bank_map.json', 'w', encoding='utf-8') as f:
+        json.dump({'宇波银行': '宁波银行', '苏州银行': '苏州农商银行', '江南银千': '江阴银行'}, f, ensure_ascii=False)
+    monkeypatch.chdir(tmp_path)
+    index = BankNameIndex.load()
+    assert index.correct('宇波银千') == '宁波银行'
+    assert index.correct('宇州农商银行') == '宇州农商银行'  # no such known name
+    assert index.correct('江南银行') == '江南银行'  # 南/阴 of a two-char diff is not learned
@@ -0,0 +1,46 @@
+''' Behaviour of `OfferTable.prune`: values equal by yield to existing ones are dropped.
+'''
+import pytest
+from util.offers import OfferTable
+
+
+def make_table(*rows: list[str]) -> OfferTable:
+    return OfferTable.parse([list(row) for row in rows])
+
+
+def test_equal_yields_are_dropped() -> None:
+    table = make_table(['甲银行', '2.1', '2.20', '', '', '2.5'])
+    assert table.prune({'甲银行': ['2.10', '2.2', '', '', '2.6']}) == 2
+    assert table.to_lists() == [['甲银行', '', '', '', '', '2.5']]  # a different value is kept to overwrite
+
+
+def test_rows_without_values_are_dropped() -> None:
+    table = make_table(['甲银行', '2.1', '', '', '', ''], ['乙银行', '2.1', '', '', '', ''])
+    assert table.prune({'甲银行': ['2.1', '', '', '', '']}) == 1
+    assert table.to_lists() == [['乙银行', '2.1', '', '', '', '']]
+
+
+def test_terms_and_names_must_match() -> None:
+    table = make_table(['甲银行', '2.1', '', '', '', ''])
+    assert table.prune({'甲银行': ['', '2.1', '', '', ''], '乙银行': ['2.1', '', '', '', '']}) == 0
+    assert table.to_lists() == [['甲银行', '2.1', '', '', '', '']]
+
+
+@pytest.mark.parametrize('existing', ['--', 'abc', '2.1%'])
+def test_unparsable_existing_values_never_match(existing: str) -> None:
+    table = make_table(['甲银行', '2.1', '2.2', '', '', ''])
+    assert table.prune({'甲银行': [existing, '2.2', '', '', '']}) == 1
+    assert table.to_lists() == [['甲银行', '2.1', '', '', '', '']]
+
+
+def test_nothing_exists() -> None:
+    table = make_table(['甲银行', '2.1', '', '', '', ''])
+    assert table.prune({}) == 0
+    assert len(table) == 1
+
+
+def test_parse_rejects_malformed_rows() -> None:
+    with pytest.raises(ValueError):
+        OfferTable.parse([['甲银行', '2.1', '', '', '']])
+    with pytest.raises(ValueError):
+        OfferTable.parse([['甲银行', 'x', '', '', '', '']])
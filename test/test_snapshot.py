@@ -0,0 +1,62 @@
+''' Behaviour of `OfferSnapshot`: recording accepted offers and reconciling with the server.
+'''
+import pytest
+from util.snapshot import OfferSnapshot
+
+DAY = 24 * 3600 * 1000
+NOTICE_DATE = 1700000000000
+
+
+@pytest.fixture
+def snapshot(tmp_path) -> OfferSnapshot:
+    return OfferSnapshot(str(tmp_path / 'snapshot.json'))
+
+
+def test_record_keeps_recorded_values(snapshot: OfferSnapshot) -> None:
+    snapshot.record(NOTICE_DATE, ['甲银行', '2.1', '2.2', '', '', ''])
+    snapshot.record(NOTICE_DATE, ['甲银行', '', '2.3', '', '', ''])
+    assert snapshot.get(NOTICE_DATE) == {'甲银行': ['2.1', '2.3', '', '', '']}
+
+
+def test_full_merge_replaces_the_date(snapshot: OfferSnapshot) -> None:
+    snapshot.record(NOTICE_DATE, ['甲银行', '2.1', '', '', '', ''])
+    snapshot.record(NOTICE_DATE, ['乙银行', '2.1', '', '', '', ''])
+    snapshot.record(NOTICE_DATE + DAY, ['甲银行', '2.1', '', '', '', ''])
+    snapshot.merge(NOTICE_DATE, {'甲银行': ['', '2.2', '', '', '']})
+    assert snapshot.get(NOTICE_DATE) == {'甲银行': ['', '2.2', '', '', '']}  # deleted on server
+    assert snapshot.get(NOTICE_DATE + DAY) == {'甲银行': ['2.1', '', '', '', '']}  # other dates are kept
+
+
+def test_empty_full_merge_clears_the_date(snapshot: OfferSnapshot) -> None:
+    snapshot.record(NOTICE_DATE, ['甲银行', '2.1', '', '', '', ''])
+    snapshot.merge(NOTICE_DATE, {})
+    assert snapshot.get(NOTICE_DATE) == {}
+
+
+def test_partial_merge_overwrites_fetched_banks(snapshot: OfferSnapshot) -> None:
+    snapshot.record(NOTICE_DATE, ['甲银行', '2.1', '', '', '', ''])
+    snapshot.record(NOTICE_DATE, ['乙银行', '2.1', '', '', '', ''])
+    snapshot.merge(NOTICE_DATE, {'甲银行': ['', '2.2', '', '', ''], '丙银行': ['2.3', '', '', '', '']}, False)
+    assert snapshot.get(NOTICE_DATE) == {
+        '甲银行': ['', '2.2', '', '', ''],
+        '乙银行': ['2.1', '', '', '', ''],  # may be in a part failed to fetch
+        '丙银行': ['2.3', '', '', '', '']
+    }
+
+
+def test_merge_copies_values(snapshot: OfferSnapshot) -> None:
+    exists = {'甲银行': ['2.1', '', '', '', '']}
+    snapshot.merge(NOTICE_DATE, exists)
+    exists['甲银行'][0] = '9.9'
+    snapshot.get(NOTICE_DATE)['甲银行'][0] = '9.9'
+    assert snapshot.get(NOTICE_DATE) == {'甲银行': ['2.1', '', '', '', '']}
+
+
+def test_save_and_load(snapshot: OfferSnapshot) -> None:
+    for day in range(10):
+        snapshot.record(NOTICE_DATE + day * DAY, ['甲银行', '2.1', '', '', '', ''])
+    snapshot.save()
+    loaded = OfferSnapshot(snapshot.path)
+    assert len(loaded.data) == snapshot.keep_days  # only the latest dates are kept
+    assert loaded.get(NOTICE_DATE + 9 * DAY) == {'甲银行': ['2.1', '', '', '', '']}
+    assert loaded.get(NOTICE_DATE) == {}
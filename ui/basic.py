@@ -1,6 +1,6 @@
 from typing import Union
 
-from PySide2.QtCore import QFile
+from PySide2.QtCore import QBuffer, QByteArray, QFile
 from PySide2.QtGui import Qt
 from PySide2.QtUiTools import QUiLoader
 from PySide2.QtWidgets import QApplication, QDialog, QMainWindow, QWidget
@@ -9,26 +9,39 @@ from PySide2.QtWidgets import QApplication, QDialog, QMainWindow, QWidget
 class WidgetUtil:
     ''' A utility class contains common methods used by Qt-related classes.
     '''
+    loader = None  # one loader for all forms, creating it scans designer plugins
+    forms: dict[str, QByteArray] = {}  # ui path -> xml content
+
     @staticmethod
     def load_window(ui_path: str) -> Union[QWidget, QDialog, QMainWindow]:
-        qfile = QFile(ui_path)
-        qfile.open(QFile.ReadOnly)
-        qfile.close()
-        return QUiLoader().load(qfile)
+        if WidgetUtil.loader is None: WidgetUtil.loader = QUiLoader()
+        if ui_path not in WidgetUtil.forms:
+            qfile = QFile(ui_path)
+            qfile.open(QFile.ReadOnly)
+            WidgetUtil.forms[ui_path] = qfile.readAll()
+            qfile.close()
+        buffer = QBuffer(WidgetUtil.forms[ui_path])
+        buffer.open(QBuffer.ReadOnly)
+        return WidgetUtil.loader.load(buffer)
 
 
 class BasicWidget(QWidget):
-    ''' Define basic behaviour of widgets.
+    ''' Define basic behaviour of widgets. An instance can be run again
+    after its window is closed, attributes and handlers are only set once.
     '''
     def __init__(self, ui_path) -> None:
         super().__init__()
         self.win = WidgetUtil.load_window(ui_path)
+        self.is_ready = False
 
     def run(self) -> None:
-        self.set_attributes()
-        self.set_handlers()
+        if not self.is_ready:
+            self.set_attributes()
+            self.set_handlers()
+            self.is_ready = True
         self.set_init_values()
         if not self.win.isVisible(): self.win.show()
+        self.win.activateWindow()
 
     def set_attributes(self) -> None:
         pass
@@ -41,16 +54,21 @@ class BasicWidget(QWidget):
 
 
 class BasicDialog(QDialog):
-    ''' Define basic behaviour of dialogs.
+    ''' Define basic behaviour of dialogs. An instance can be run again
+    after its window is closed, attributes and handlers are only set once.
     '''
     def __init__(self, ui_path) -> None:
         super().__init__()
         self.win = WidgetUtil.load_window(ui_path)
+        self.is_ready = False
 
     def run(self) -> None:
-        self.set_attributes()
-        self.set_handlers()
+        if not self.is_ready:
+            self.set_attributes()
+            self.set_handlers()
+            self.is_ready = True
         if not self.win.isVisible(): self.win.show()
+        self.win.activateWindow()
 
     def set_attributes(self) -> None:
         self.win.setWindowFlags(Qt.CustomizeWindowHint | Qt.WindowCloseButtonHint)
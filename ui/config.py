@@ -1,5 +1,6 @@
 from util.const import Const
 from PySide2.QtCore import Signal
+from util.cache import BankCache
 from util.data import JsonUtil
 
 from ui.basic import BasicWidget
@@ -15,7 +16,11 @@ class CommonWindow(BasicWidget):
         self.conf_path = Const.FILE_JSON_USER_CONF
 
     def set_handlers(self) -> None:
+        self.win.skip_existing.clicked.connect(self.__handle_skip_existing)
         self.win.enable_multi_thread.clicked.connect(self.__handle_enable_multi_thread)
+        self.win.enable_async.clicked.connect(self.__handle_enable_async)
+        self.win.enable_adaptive.clicked.connect(self.__handle_enable_adaptive)
+        self.win.btn_clear_cache.clicked.connect(self.__handle_clear_cache)
         self.win.btn_save.clicked.connect(self.__handle_save)
         self.win.btn_cancel.clicked.connect(self.win.close)
 
@@ -23,6 +28,8 @@ class CommonWindow(BasicWidget):
         try:
             self.user, self.comm = JsonUtil.load(self.conf_path)
             if not isinstance(self.user, dict) or not isinstance(self.comm, dict): raise TypeError
+            for field_name, value in Const.DEFAULT_COMM.items():
+                self.comm.setdefault(field_name, value)
             self.conf_status.emit(True, self.conf_path, '')
         except Exception as ex:
             self.user = {
@@ -31,32 +38,74 @@ class CommonWindow(BasicWidget):
                 Const.CONF_LOGIN_TERMINAL: 10,
                 Const.CONF_CARRY_ON: 1
             }
-            self.comm = {Const.CONF_SKIP_EXISTING: False, Const.CONF_MULTI_THREAD: False, Const.CONF_MAX_WORKERS: 1}
+            self.comm = dict(Const.DEFAULT_COMM)
             JsonUtil.save(self.conf_path, [self.user, self.comm])
             self.conf_status.emit(False, self.conf_path, ex.__str__())
-        if self.user[Const.CONF_USERNAME]: self.win.username.setText(self.user[Const.CONF_USERNAME])
-        if self.user[Const.CONF_PASSWORD]: self.win.password.setText(self.user[Const.CONF_PASSWORD])
-        if self.comm[Const.CONF_SKIP_EXISTING]: self.win.skip_existing.click()
-        if self.comm[Const.CONF_MULTI_THREAD]: self.win.enable_multi_thread.click()
+        self.win.username.setText(self.user[Const.CONF_USERNAME])
+        self.win.password.setText(self.user[Const.CONF_PASSWORD])
+        self.__set_checked(self.win.skip_existing, self.comm[Const.CONF_SKIP_EXISTING])
+        self.__set_checked(self.win.reconcile_server, self.comm[Const.CONF_RECONCILE])
+        self.__set_checked(self.win.enable_multi_thread, self.comm[Const.CONF_MULTI_THREAD])
         self.win.max_workers.setValue(self.comm[Const.CONF_MAX_WORKERS])
+        self.win.resolve_workers.setValue(self.comm[Const.CONF_RESOLVE_WORKERS])
+        self.win.rank_workers.setValue(self.comm[Const.CONF_RANK_WORKERS])
+        self.__set_checked(self.win.enable_adaptive, self.comm[Const.CONF_ADAPTIVE])
+        self.win.min_workers.setValue(self.comm[Const.CONF_MIN_WORKERS])
+        self.__set_checked(self.win.enable_async, self.comm[Const.CONF_ASYNC])
+        self.win.async_limit.setValue(self.comm[Const.CONF_ASYNC_LIMIT])
+        self.win.cache_ttl.setValue(self.comm[Const.CONF_CACHE_TTL])
+        self.win.batch_size.setValue(self.comm[Const.CONF_BATCH_SIZE])
+        self.win.btn_clear_cache.setEnabled(True)
 
     # handlers
+    def __handle_skip_existing(self, enabled: bool) -> None:
+        self.win.reconcile_server.setEnabled(enabled)
+
     def __handle_enable_multi_thread(self, enabled: bool) -> None:
         self.win.max_workers.setEnabled(enabled)
+        self.win.resolve_workers.setEnabled(enabled)
+        self.win.rank_workers.setEnabled(enabled)
+
+    def __handle_enable_async(self, enabled: bool) -> None:
+        self.win.async_limit.setEnabled(enabled)
+
+    def __handle_enable_adaptive(self, enabled: bool) -> None:
+        self.win.min_workers.setEnabled(enabled)
+
+    def __handle_clear_cache(self) -> None:
+        cache = BankCache()
+        cache.invalidate()
+        cache.save()
+        self.conf_status.emit(True, cache.path, 'all cached ids and ranks are cleared')
+        self.win.btn_clear_cache.setDisabled(True)
 
     def __handle_save(self) -> None:
         add_msg = []
         self.__update_and_msg(add_msg, self.user, Const.CONF_USERNAME, self.win.username.text())
         self.__update_and_msg(add_msg, self.user, Const.CONF_PASSWORD, self.win.password.text())
         self.__update_and_msg(add_msg, self.comm, Const.CONF_SKIP_EXISTING, self.win.skip_existing.isChecked())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_RECONCILE, self.win.reconcile_server.isChecked())
         self.__update_and_msg(add_msg, self.comm, Const.CONF_MULTI_THREAD, self.win.enable_multi_thread.isChecked())
         self.__update_and_msg(add_msg, self.comm, Const.CONF_MAX_WORKERS, self.win.max_workers.value())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_RESOLVE_WORKERS, self.win.resolve_workers.value())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_RANK_WORKERS, self.win.rank_workers.value())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_ADAPTIVE, self.win.enable_adaptive.isChecked())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_MIN_WORKERS, self.win.min_workers.value())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_ASYNC, self.win.enable_async.isChecked())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_ASYNC_LIMIT, self.win.async_limit.value())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_CACHE_TTL, self.win.cache_ttl.value())
+        self.__update_and_msg(add_msg, self.comm, Const.CONF_BATCH_SIZE, self.win.batch_size.value())
         if add_msg:
             JsonUtil.save(self.conf_path, [self.user, self.comm])
             self.conf_status.emit(True, self.conf_path, '; '.join(add_msg))
         self.win.close()
 
     # helpers
+    def __set_checked(self, check_box, checked: bool) -> None:
+        ''' Check like a click, but also right if the window is reused and the box is already checked.
+        '''
+        if check_box.isChecked() != checked: check_box.click()
+
     def __update_and_msg(self, add_msg, origin_dict, field_name, new_value):
         if origin_dict[field_name] != new_value:
             add_msg.append(f'{field_name}: <i>{origin_dict[field_name]}</i> -> <i>{new_value}</i>')
@@ -1,4 +1,4 @@
-from PySide2.QtCore import Signal
+from PySide2.QtCore import QTimer, Signal
 from PySide2.QtWidgets import QFileDialog
 from util.const import Const
 from util.data import JsonUtil, ValidateUtil
@@ -37,32 +37,61 @@ class CreateWindow(BasicWidget):
 
     def __init__(self) -> None:
         super().__init__(Const.FILE_UI_CREATE)
+        self.jump = None
+        self.blocks = ['']  # text of each line in content, kept in step with edits
+        self.lines = []
+        self.validate_timer = QTimer(self)
+        self.validate_timer.setSingleShot(True)
+        self.validate_timer.setInterval(Const.VALIDATE_DELAY)
 
     def set_handlers(self) -> None:
-        self.win.content.textChanged.connect(self.__handle_text_changed)
+        self.win.content.document().contentsChange.connect(self.__handle_contents_change)
+        self.validate_timer.timeout.connect(self.__validate)
         self.win.btn_save.clicked.connect(self.__handle_save)
         self.win.btn_cancel.clicked.connect(self.win.close)
 
+    def set_init_values(self) -> None:
+        if not self.win.isVisible(): self.win.content.clear()
+
     # handlers
-    def __handle_text_changed(self) -> None:
-        self.lines = [x for x in self.win.content.toPlainText().split('\n') if x]
-        is_valid, msg = ValidateUtil.validate_txt(content=self.lines)
-        self.win.status.setText(msg)
-        self.win.btn_save.setEnabled(is_valid)
+    def __handle_contents_change(self, position: int, removed: int, added: int) -> None:
+        # only lines touched by the edit are read again, then validate once typing pauses
+        doc = self.win.content.document()
+        first = doc.findBlock(position).blockNumber()
+        last = doc.findBlock(min(position + added, doc.characterCount() - 1)).blockNumber()
+        grown = doc.blockCount() - len(self.blocks)
+        spliced = 0 <= first <= last + 1 - grown
+        if spliced:
+            self.blocks[first:last + 1 - grown] = [doc.findBlockByNumber(i).text() for i in range(first, last + 1)]
+        if not spliced or len(self.blocks) != doc.blockCount():  # unexpected change info, read all again
+            self.blocks = self.win.content.toPlainText().split('\n')
+        self.validate_timer.start()
 
     def __handle_save(self) -> None:
+        if self.validate_timer.isActive():  # saved before the pending validation
+            self.validate_timer.stop()
+            if not self.__validate(): return
         self.txt_path, _ = QFileDialog.getSaveFileName(self, 'Save txt', './', '*.txt')
         with open(self.txt_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(self.lines))
         self.saved_success.emit(self.txt_path)
-        self.jump = self.JumpWindow()
-        self.jump.ask_jump.connect(self.__handle_jump)
+        if self.jump is None:
+            self.jump = self.JumpWindow()
+            self.jump.ask_jump.connect(self.__handle_jump)
         self.jump.run()
         self.win.close()
 
     def __handle_jump(self, do_jump: bool) -> None:
         if do_jump: self.require_jump.emit(self.txt_path)
 
+    # helpers
+    def __validate(self) -> bool:
+        self.lines = [x for x in self.blocks if x]
+        is_valid, msg = ValidateUtil.validate_txt(content=self.lines)
+        self.win.status.setText(msg)
+        self.win.btn_save.setEnabled(is_valid)
+        return is_valid
+
 
 class ConvertWindow(BasicWidget):
     ''' Define behaviour of file->convert window.
@@ -71,10 +100,7 @@ class ConvertWindow(BasicWidget):
 
     def __init__(self, txt_path: str = '') -> None:
         super().__init__(Const.FILE_UI_CONVERT)
-        if txt_path:
-            self.txt_path = txt_path
-            self.win.addr.setText(txt_path)
-            self.win.table.setEnabled(True)
+        self.txt_path = txt_path
 
     def set_handlers(self) -> None:
         self.win.btn_select.clicked.connect(self.__handle_select)
@@ -82,6 +108,11 @@ class ConvertWindow(BasicWidget):
         self.win.btn_convert.clicked.connect(self.__handle_convert)
         self.win.btn_cancel.clicked.connect(self.win.close)
 
+    def set_init_values(self) -> None:
+        self.win.addr.setText(self.txt_path)
+        self.win.table.setEnabled(bool(self.txt_path))
+        self.win.btn_convert.setDisabled(True)
+
     # handlers
     def __handle_select(self) -> None:
         self.txt_path, _ = QFileDialog.getOpenFileName(self, 'Load txt', './', '*.txt')
@@ -1,19 +1,32 @@
+import datetime
 import os
 import sys
 import time
-from threading import Thread
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING
 
-from PySide2.QtCore import QDate
+from PySide2.QtCore import QDate, QObject, QTimer, Signal
 from PySide2.QtGui import QCloseEvent
-from PySide2.QtWidgets import QFileDialog
+from PySide2.QtWidgets import QFileDialog, QListWidgetItem
 from util.const import Const
 from util.data import JsonUtil, ValidateUtil
-from util.request import RequestUtil
+from util.event import EventBuffer
+from util.journal import SubmitJournal
 
 from ui.basic import BasicWindow
-from ui.config import CommonWindow
-from ui.file import ConvertWindow, CreateWindow, QuitWindow
-from ui.help import AboutQtWindow, AboutWindow
+
+# `util.request` (requests and friends) and modules of dialogs are imported where
+# they are first used, so that the main window paints sooner
+if TYPE_CHECKING:
+    from util.request import RequestUtil
+
+
+class SubmitBridge(QObject):
+    ''' Tell the GUI thread that a submit task (or a warm-up) is finished, and whether it succeeded.
+    A warm-up also tells which one it is, by its cancel `Event`.
+    '''
+    finished = Signal(bool)
+    warmed = Signal(bool, object)
 
 
 class MainWindow(BasicWindow):
@@ -21,6 +34,31 @@ class MainWindow(BasicWindow):
     '''
     def __init__(self) -> None:
         super().__init__(Const.FILE_UI_MAIN)
+        # logs and progress of a submit task are buffered and shown on a timer,
+        # so that the cost to the GUI does not grow with the number of offers
+        self.logs = EventBuffer()
+        self.percent = EventBuffer(latest=True)
+        self.job_percent = EventBuffer()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setInterval(Const.LOG_FLUSH_INTERVAL)
+        self.flush_timer.timeout.connect(self.__flush_submit)
+        self.bridge = SubmitBridge()
+        self.bridge.finished.connect(self.__handle_submit_finished)
+        self.bridge.warmed.connect(self.__handle_warmed)
+        self.req = None  # one client for the app lifetime, built on first use
+        self.req_lock = Lock()
+        # a warm-up starts once a valid file is selected, and is cancelled if the file or date changes
+        self.warm_key: tuple[str, datetime.date] = None
+        self.warm_cancel = Event()
+        self.warm_thread: Thread = None
+        self.jobs: list[dict] = []  # queued (file, date) pairs, submitted together on start
+        # child windows are built on first use and reused later
+        self.quit = None
+        self.create_txt = None
+        self.convert_json = None
+        self.common = None
+        self.about = None
+        self.about_qt = None
 
     def run(self) -> None:
         super().run()
@@ -31,9 +69,12 @@ class MainWindow(BasicWindow):
         self.win.date.dateChanged.connect(self.__handle_date)
         self.win.btn_select.clicked.connect(self.__handle_select)
         self.win.btn_start.clicked.connect(self.__handle_start)
+        self.win.btn_queue.clicked.connect(self.__handle_queue)
+        self.win.queue.itemDoubleClicked.connect(self.__handle_unqueue)
         # file
         self.win.create_txt.triggered.connect(self.__handle_create_txt)
-        self.win.convert.triggered.connect(self.__handle_convert_json)
+        self.win.convert.triggered.connect(lambda: self.__handle_convert_json())  # not with `checked`
+        self.win.resume.triggered.connect(self.__handle_resume)
         self.win.quit.triggered.connect(self.close)
         # config
         self.win.common.triggered.connect(self.__handle_common)
@@ -48,12 +89,15 @@ class MainWindow(BasicWindow):
         local_time = time.localtime(time.time())
         date = QDate(local_time.tm_year, local_time.tm_mon, local_time.tm_mday)
         self.win.date.setDate(date)
+        self.win.queue.setVisible(bool(self.jobs))
 
     # events
     def closeEvent(self, event: QCloseEvent) -> None:
         if self.is_running:
-            self.quit = QuitWindow()
-            self.quit.force_quit.connect(self.app.quit)
+            if self.quit is None:
+                from ui.file import QuitWindow
+                self.quit = QuitWindow()
+                self.quit.force_quit.connect(self.app.quit)
             self.quit.run()
         else:
             self.app.quit()
@@ -63,6 +107,7 @@ class MainWindow(BasicWindow):
     def __handle_date(self, new_date: QDate) -> None:
         if self.win.date.editingFinished:
             self.__add_log(Const.LOCAL, f'Date changed to {new_date.toPython()}')
+            self.__start_warm_up()
 
     def __handle_select(self) -> None:
         self.__add_log(Const.LOCAL, 'Selecting json file...')
@@ -71,26 +116,68 @@ class MainWindow(BasicWindow):
             self.__add_log(Const.LOCAL, 'Selection cancelled')
         else:
             self.__check_selected(json_path)
+            self.__start_warm_up()  # or cancel the one of a former selection, if invalid
 
     def __handle_start(self) -> None:
-        self.__add_log(Const.LOCAL, 'Start to exec submit task')
-        self.is_running = True
-        self.win.btn_select.setDisabled(True)
-        self.win.btn_start.setDisabled(True)
-        self.win.progress_bar.setValue(0)
-        Thread(target=self.__exec_submit, daemon=True).start()
+        if not self.jobs and not self.__queue_job(self.win.addr.text(), self.win.date.date().toPython()): return
+        self.__add_log(Const.LOCAL, f'Start to exec submit task of {len(self.jobs)} job(s)')
+        self.__start_submit()
 
-    def __handle_submit_log(self, log: str) -> None:
-        level = Const.LOG_ERRO if log.startswith('! ') else Const.LOG_INFO
-        self.__add_log(Const.NETWORK, log.lstrip('! '), level)
+    def __handle_queue(self) -> None:
+        self.__queue_job(self.win.addr.text(), self.win.date.date().toPython())
+
+    def __handle_unqueue(self, item: QListWidgetItem) -> None:
+        if self.is_running: return
+        job = self.jobs.pop(self.win.queue.row(item))
+        self.__show_queue()
+        self.__add_log(Const.LOCAL, f'Removed [{job["src"]}] @ {job["date"]} from queue')
+        self.win.btn_start.setEnabled(bool(self.jobs or self.win.addr.text()))
 
-    def __handle_update_percent(self, perc: int) -> None:
-        self.win.progress_bar.setValue(perc)
+    def __handle_resume(self) -> None:
+        if self.is_running:
+            self.__add_log(Const.LOCAL, 'Cannot resume while a submit task is running', Const.LOG_WARN)
+            return
+        pending = SubmitJournal().pending()
+        if pending is None:
+            self.__add_log(Const.LOCAL, 'Nothing to resume, the last submit task is finished')
+            return
+        self.jobs = []
+        for job in pending:
+            date = datetime.date.fromtimestamp(job['noticeDate'] / 1000)
+            if not self.__queue_job(job['file'], date, job['noticeDate'], job['done']):
+                self.jobs = []
+                self.__show_queue()
+                return
+        done = sum(len(job['done']) for job in pending)
+        self.__add_log(Const.LOCAL, f'Resume submit task of {len(self.jobs)} job(s), {done} bank(s) already succeeded')
+        self.__start_submit(resume=True)
+
+    def __handle_submit_finished(self, success: bool) -> None:
+        self.flush_timer.stop()
+        self.__flush_submit()
+        self.jobs = []
+        self.__show_queue()
+        self.win.btn_start.setEnabled(bool(self.win.addr.text()))
+        self.win.btn_queue.setEnabled(bool(self.win.addr.text()))
+        self.win.btn_select.setEnabled(True)
+        self.is_running = False
+        self.warm_key = None  # offers on server have changed, warm up again if needed
+        if success:
+            self.__add_log(Const.LOCAL, 'Submit task completed')
+        else:
+            self.__add_log(Const.LOCAL, 'Submit task failed', Const.LOG_ERRO)
+
+    def __handle_warmed(self, success: bool, cancel: Event) -> None:
+        if self.is_running: return  # logs are flushed by the submit task
+        self.__flush_submit()
+        if cancel is self.warm_cancel: self.flush_timer.stop()  # or a newer warm-up is still running
 
     def __handle_create_txt(self) -> None:
-        self.create_txt = CreateWindow()
-        self.create_txt.saved_success.connect(self.__handle_saved)
-        self.create_txt.require_jump.connect(self.__handle_jump)
+        if self.create_txt is None:
+            from ui.file import CreateWindow
+            self.create_txt = CreateWindow()
+            self.create_txt.saved_success.connect(self.__handle_saved)
+            self.create_txt.require_jump.connect(self.__handle_jump)
         self.create_txt.run()
 
     def __handle_saved(self, txt_path: str) -> None:
@@ -100,17 +187,23 @@ class MainWindow(BasicWindow):
         self.__handle_convert_json(txt_path)
 
     def __handle_convert_json(self, txt_path: str = '') -> None:
-        self.convert_json = ConvertWindow(txt_path)
-        self.convert_json.converted.connect(self.__handle_converted)
+        if self.convert_json is None:
+            from ui.file import ConvertWindow
+            self.convert_json = ConvertWindow()
+            self.convert_json.converted.connect(self.__handle_converted)
+        self.convert_json.txt_path = txt_path
         self.convert_json.run()
 
     def __handle_converted(self, json_path: str) -> None:
         self.__add_log(Const.LOCAL, f'Converted and saved data into [{json_path}]')
         self.__check_selected(json_path)
+        self.__start_warm_up()
 
     def __handle_common(self) -> None:
-        self.common = CommonWindow()
-        self.common.conf_status.connect(self.__handle_load_conf)
+        if self.common is None:
+            from ui.config import CommonWindow
+            self.common = CommonWindow()
+            self.common.conf_status.connect(self.__handle_load_conf)
         self.common.run()
 
     def __handle_load_conf(self, status: bool, conf_path: str, add_msg: str) -> None:
@@ -132,79 +225,199 @@ class MainWindow(BasicWindow):
         os.system(f'notepad.exe {Const.FILE_JSON_URL_RULE}')
 
     def __handle_about(self) -> None:
-        self.about = AboutWindow()
+        if self.about is None:
+            from ui.help import AboutWindow
+            self.about = AboutWindow()
         self.about.run()
 
     def __handle_about_qt(self) -> None:
-        self.about_qt = AboutQtWindow()
+        if self.about_qt is None:
+            from ui.help import AboutQtWindow
+            self.about_qt = AboutQtWindow()
         self.about_qt.run()
 
     # helpers
     def __add_log(self, target: str, log: str, level: str = Const.LOG_INFO) -> None:
+        self.__append_logs(target, [self.__format_log(log, level)])
+
+    def __queue_log(self, target: str, log: str, level: str = Const.LOG_INFO) -> None:
+        ''' Like `__add_log`, but thread-safe, the log is shown on the next flush.
+        '''
+        self.logs.put((target, self.__format_log(log, level)))
+
+    def __queue_submit_log(self, log: str) -> None:
+        level = Const.LOG_ERRO if log.startswith('! ') else Const.LOG_INFO
+        self.__queue_log(Const.NETWORK, log.lstrip('! '), level)
+
+    def __flush_submit(self) -> None:
+        ''' Show logs and progress buffered since the last flush, one append per log view.
+        '''
+        lines = {Const.LOCAL: [], Const.NETWORK: []}
+        for target, formatted in self.logs.take():
+            lines[target.lower()].append(formatted)
+        for target, formatted in lines.items():
+            if formatted: self.__append_logs(target, formatted)
+        for perc in self.percent.take():
+            self.win.progress_bar.setValue(perc)
+        for index, perc in dict(self.job_percent.take()).items():  # the latest one of each job
+            self.win.queue.item(index).setText(f'{self.__describe_job(self.jobs[index])} - {perc}%')
+
+    def __format_log(self, log: str, level: str) -> str:
         color = {
             Const.LOG_INFO: Const.LOG_INFO_COLOR,
             Const.LOG_WARN: Const.LOG_WARN_COLOR,
             Const.LOG_ERRO: Const.LOG_ERRO_COLOR
         }
         level = f'<span style="color: {color[level]};">{level}</span>'
-        formatted = f'[{time.ctime(time.time())}] {level} -> {log}'
+        return f'[{time.ctime(time.time())}] {level} -> {log}'
+
+    def __append_logs(self, target: str, formatted: list[str]) -> None:
         if target.lower() == Const.LOCAL:
-            self.win.log_local.append(formatted)
+            self.win.log_local.append('<br>'.join(formatted))
         elif target.lower() == Const.NETWORK:
-            self.win.log_network.append(formatted)
+            self.win.log_network.append('<br>'.join(formatted))
 
-    def __check_selected(self, json_path: str) -> None:
+    def __check_selected(self, json_path: str) -> bool:
         is_valid, msg = ValidateUtil.validate_json(json_path)
         if is_valid:
             self.__add_log(Const.LOCAL, f'Selected [{json_path}] is parsed as: {msg}')
             self.win.addr.setText(json_path)
-            self.win.btn_start.setEnabled(True)
         else:
             self.__add_log(Const.LOCAL, f'Selected [{json_path}] is invalid: {msg}', Const.LOG_ERRO)
             self.win.addr.clear()
-            self.win.btn_start.setDisabled(True)
+        self.win.btn_start.setEnabled(not self.is_running and (is_valid or bool(self.jobs)))
+        self.win.btn_queue.setEnabled(not self.is_running and is_valid)
+        return is_valid
 
-    def __exec_submit(self) -> None:
-        ''' return None\n
-        Exec the entire process of submission, including load data, login,
-        submit, print logs and recover the state of related widgets.
+    def __queue_job(self, src: str, date: datetime.date, notice_date: int = None, done: set[str] = None) -> bool:
+        ''' @return bool - `True` if the job is queued or already in queue\n
+        Queue a job of the json file `src` on `date`. A resumed job keeps its `notice_date`
+        and skips `done` banks, see `SubmitJournal.pending`.
         '''
-        def finish_or_recover(success: bool):
-            self.win.btn_start.setEnabled(True)
-            self.win.btn_select.setEnabled(True)
-            self.is_running = False
-            if success:
-                self.__add_log(Const.LOCAL, 'Submit task completed')
-            else:
-                self.__add_log(Const.LOCAL, 'Submit task failed', Const.LOG_ERRO)
-
-        req = RequestUtil()
-        req.new_log.connect(self.__handle_submit_log)
-        req.cur_percent.connect(self.__handle_update_percent)
-        data = JsonUtil.load(self.win.addr.text())
-        offset = self.win.date.date().daysTo(QDate.currentDate())
-        if offset < 0:
+        if date > datetime.date.today():
             self.__add_log(Const.LOCAL, 'Cannot submit offers from future', Const.LOG_ERRO)
-            finish_or_recover(False)
+            return False
+        if any(job['src'] == src and job['date'] == date for job in self.jobs): return True
+        if not self.__check_selected(src): return False
+        self.jobs.append({'src': src, 'date': date, 'noticeDate': notice_date, 'done': done or set()})
+        self.__show_queue()
+        self.__add_log(Const.LOCAL, f'Queued [{src}] @ {date}, {len(self.jobs)} job(s) in queue')
+        return True
+
+    def __show_queue(self) -> None:
+        self.win.queue.clear()
+        self.win.queue.addItems([self.__describe_job(job) for job in self.jobs])
+        self.win.queue.setVisible(bool(self.jobs))
+
+    def __describe_job(self, job: dict) -> str:
+        return f'[{job["src"]}] @ {job["date"]}'
+
+    def __start_warm_up(self) -> None:
+        ''' Warm up for the selected file and date in a worker thread, see `RequestUtil.warm_up`.
+        A running warm-up for another file or date is cancelled, and its results are discarded.
+        '''
+        src = self.win.addr.text()
+        key = (src, self.win.date.date().toPython()) if src else None
+        if self.is_running or key == self.warm_key: return
+        self.warm_cancel.set()
+        self.warm_key, self.warm_cancel = key, Event()
+        if self.req is not None: self.req.discard_warm_up()
+        if key is None or key[1] > datetime.date.today():
+            self.flush_timer.stop()  # logs of the cancelled warm-up are flushed once it ends
             return
-        notice_date = 1000 * (int(time.time()) - 86400 * offset)
+        self.flush_timer.start()
+        args = (*key, self.warm_cancel, self.warm_thread)
+        self.warm_thread = Thread(target=self.__exec_warm_up, args=args, daemon=True)
+        self.warm_thread.start()
+
+    def __exec_warm_up(self, src: str, date: datetime.date, cancel: Event, previous: Thread = None) -> None:
+        ''' return None\n
+        Exec a warm-up in a worker thread after the `previous` (cancelled) one ends, errors
+        are only logged, the submit task will meet and report them again.
+        '''
+        from util.job import SubmitJob
+        from util.request import RequestUtil
+        if previous is not None: previous.join()
+        success = False
         try:
+            req = self.__get_request()
+            req.reload()
+            job = SubmitJob(JsonUtil.load(src), RequestUtil.make_notice_date((datetime.date.today() - date).days), src)
+            success = req.warm_up([job], cancel.is_set)
+        except Exception as ex:
+            self.__queue_log(Const.LOCAL, f'Warm-up failed: {ex.__str__()}', Const.LOG_WARN)
+        self.bridge.warmed.emit(success, cancel)
+
+    def __get_request(self) -> 'RequestUtil':
+        ''' @return RequestUtil - the client of the app, built on first call in any thread
+        '''
+        from util.request import RequestUtil
+        with self.req_lock:
+            if self.req is None:
+                req = RequestUtil()
+                req.new_log.connect(self.__queue_submit_log)
+                req.cur_percent.connect(self.percent.put)
+                req.job_progress.connect(lambda index, perc: self.job_percent.put((index, perc)))
+                self.req = req
+        return self.req
+
+    def __start_submit(self, resume: bool = False) -> None:
+        self.warm_cancel.set()  # what is done so far is kept, the submit task does the rest at full speed
+        self.is_running = True
+        self.win.btn_select.setDisabled(True)
+        self.win.btn_start.setDisabled(True)
+        self.win.btn_queue.setDisabled(True)
+        self.win.progress_bar.setValue(0)
+        self.flush_timer.start()
+        args = ([dict(job) for job in self.jobs], resume, self.warm_thread)
+        Thread(target=self.__exec_submit, args=args, daemon=True).start()
+
+    def __exec_submit(self, queued: list[dict], resume: bool = False, warm_thread: Thread = None) -> None:
+        ''' return None\n
+        Exec the entire process of submission in a worker thread, including load data,
+        login, submit and queue logs, then tell the GUI thread to recover related widgets.
+        All `queued` jobs are submitted in one run, banks `done` by an interrupted run are skipped.
+        A cancelled `warm_thread` is waited for, so that its requests do not overlap the run.
+        '''
+        from util.job import SubmitJob
+        from util.request import RequestUtil
+        if warm_thread is not None: warm_thread.join()
+        try:
+            self.__get_request().start_run()  # config edited since the last run, e.g. in notepad, is reloaded here
+        except Exception as ex:
+            self.__queue_log(Const.LOCAL, f'Cannot load config: {ex.__str__()}', Const.LOG_ERRO)
+            self.bridge.finished.emit(False)
+            return
+        req, jobs = self.req, []
+        try:
+            for job in queued:
+                offset = (datetime.date.today() - job['date']).days
+                notice_date = job['noticeDate'] or RequestUtil.make_notice_date(offset)
+                data = [bank for bank in JsonUtil.load(job['src']) if bank[0] not in job['done']]
+                jobs.append(SubmitJob(data, notice_date, job['src']))
             msg = req.login()
             if msg: raise Exception(msg)
-            failed = req.add_offers(data, notice_date)
-            time.sleep(0.5)  # ensure order of logs
+            req.add_jobs(jobs, resume)
         except Exception as ex:
             success = False
-            self.__add_log(Const.NETWORK, ex.__str__(), Const.LOG_ERRO)
+            self.__queue_log(Const.NETWORK, ex.__str__(), Const.LOG_ERRO)
         else:
             success = True
+            self.__queue_log(Const.NETWORK, f'* Totally {req.retry.count} retry(s)')
+            failed = [(job, fail) for job in jobs for fail in job.failed]
             if not failed:
-                self.__add_log(Const.NETWORK, '* All Succeeded *')
+                self.__queue_log(Const.NETWORK, '* All Succeeded *')
             else:
-                self.__add_log(Const.NETWORK, f'* Totally {len(failed)} fail(s):', Const.LOG_WARN)
-                for fail in failed:
-                    self.__add_log(Const.NETWORK, str(fail), Const.LOG_WARN)
-        finish_or_recover(success)
+                self.__queue_log(Const.NETWORK, f'* Totally {len(failed)} fail(s):', Const.LOG_WARN)
+                for job, fail in failed:
+                    self.__queue_log(Const.NETWORK, f'{job}: {fail}' if len(jobs) > 1 else str(fail), Const.LOG_WARN)
+        try:
+            path = req.save_report(', '.join(job['src'] for job in queued), jobs[0].notice_date if jobs else None)
+            self.__queue_log(Const.LOCAL, f'Run report is saved into [{path}]')
+        except Exception as ex:
+            self.__queue_log(Const.LOCAL, f'Cannot save run report: {ex.__str__()}', Const.LOG_ERRO)
+        finally:
+            self.bridge.finished.emit(success)  # widgets are recovered whatever happens
 
 
 if __name__ == '__main__':
@@ -0,0 +1,83 @@
+import time
+from threading import Lock
+
+from util.const import Const
+from util.data import JsonUtil
+
+
+class BankCache:
+    ''' A persistent cache of bank name -> issuer id and issuer id -> credit rank.
+    Entries older than `ttl` days are evicted on load and treated as missing.
+    '''
+    def __init__(self, ttl: float = 7, path: str = Const.FILE_JSON_BANK_CACHE) -> None:
+        self.ttl = 86400 * ttl
+        self.path = path
+        self.lock = Lock()
+        self.dirty = False
+        data = JsonUtil.load(path) if ttl > 0 else None
+        if not isinstance(data, dict): data = {}
+        self.ids: dict[str, list] = self.__evict(data.get('id', {}))
+        self.ranks: dict[str, list] = self.__evict(data.get('rank', {}))
+
+    def get_id(self, bank_name: str) -> str:
+        ''' @return str - cached institution id, `None` if missing or expired
+        '''
+        return self.__get(self.ids, bank_name)
+
+    def set_id(self, bank_name: str, bank_id: str) -> None:
+        ''' @return None\n
+        Only non-empty ids are cached, a bank without id may get one later.
+        '''
+        if bank_id: self.__set(self.ids, bank_name, bank_id)
+
+    def get_rank(self, bank_id: str) -> str:
+        ''' @return str - cached rank of the institution id, `None` if missing or expired
+        '''
+        return self.__get(self.ranks, bank_id)
+
+    def set_rank(self, bank_id: str, bank_rank: str) -> None:
+        ''' @return None\n
+        Empty ranks are cached too, `bank_rank.json` is the fallback of them.
+        '''
+        if bank_rank is not None: self.__set(self.ranks, bank_id, bank_rank)
+
+    def invalidate(self, bank_name: str = None) -> None:
+        ''' @return None\n
+        Drop cached entries of `bank_name`, or everything if it is not given.
+        '''
+        with self.lock:
+            if bank_name is None:
+                self.ids.clear()
+                self.ranks.clear()
+            elif bank_name in self.ids:
+                self.ranks.pop(self.ids.pop(bank_name)[0], None)
+            self.dirty = True
+
+    def save(self) -> None:
+        ''' @return None\n
+        Write the cache back to disk if anything changed.
+        '''
+        with self.lock:
+            if not self.dirty: return
+            JsonUtil.save(self.path, {'id': self.ids, 'rank': self.ranks})
+            self.dirty = False
+
+    # helpers
+    def __get(self, table: dict[str, list], key: str) -> str:
+        with self.lock:
+            entry = table.get(key)
+        if entry is None or time.time() - entry[1] > self.ttl: return None
+        return entry[0]
+
+    def __set(self, table: dict[str, list], key: str, value: str) -> None:
+        with self.lock:
+            table[key] = [value, time.time()]
+            self.dirty = True
+
+    def __evict(self, table: dict[str, list]) -> dict[str, list]:
+        now = time.time()
+        return {k: v for k, v in table.items() if now - v[1] <= self.ttl}
+
+
+if __name__ == '__main__':
+    pass
@@ -12,6 +12,14 @@ class Const:
     LOG_WARN_COLOR = 'orange'
     LOG_ERRO = 'ERRO'
     LOG_ERRO_COLOR = 'red'
+    LOG_FLUSH_INTERVAL = 100  # ms, buffered logs and progress of a submit task are shown at this pace
+
+    # ui
+    VALIDATE_DELAY = 200  # ms, txt content being edited is validated once typing pauses this long
+
+    # credit ranks of issuers, `issuerCredit` of an offer is the index + 1, while `sbjRtg`
+    # (filter and response groups of offerList) is the name itself, see `RequestUtil`
+    RANKS = ['AAA', 'AA+', 'AA', 'AA-', 'A+', 'A', 'A-', 'BBB+']
 
     # user config
     CONF_USERNAME = 'loginName'
@@ -21,15 +29,61 @@ class Const:
 
     # common config
     CONF_SKIP_EXISTING = 'skipExisting'
+    CONF_RECONCILE = 'reconcileServer'  # also pull existing offers from server, not only local snapshot
     CONF_MULTI_THREAD = 'enableMultiThread'
-    CONF_MAX_WORKERS = 'maxWorkers'
+    CONF_MAX_WORKERS = 'maxWorkers'  # workers of the submit (addOffer) stage
+    CONF_RESOLVE_WORKERS = 'resolveWorkers'  # workers of the resolve (fuzzyQuery) stage
+    CONF_RANK_WORKERS = 'rankWorkers'  # workers of the rank (getRankById) stage
+    CONF_ADAPTIVE = 'enableAdaptive'  # worker counts become upper bounds of an AIMD controller
+    CONF_MIN_WORKERS = 'minWorkers'  # lower bound of the AIMD controller
+    CONF_ASYNC = 'enableAsync'
+    CONF_ASYNC_LIMIT = 'asyncLimit'  # max requests in flight of the async engine
+    CONF_CACHE_TTL = 'cacheTTL'  # in days
+    CONF_BATCH_SIZE = 'batchSize'  # banks per addOffer request, 1 to disable batch mode
+    CONF_RETRY_TRIALS = 'retryTrials'  # max trials of one request
+    CONF_RETRY_BACKOFF = 'retryBackoff'  # base delay of exponential backoff, in seconds
+    CONF_RETRY_BUDGET = 'retryBudget'  # max retries of one run
+    CONF_SESSION_TTL = 'sessionTTL'  # hours a session id is reused since login, 0 to login every run
+    CONF_WARM_UP = 'enableWarmUp'  # login, fetch existing offers and resolve banks once a file is selected
+    CONF_RETRY_PASS = 'enableRetryPass'  # try banks failed for retryable errors again at the end of a run
+    CONF_RETRY_PASS_DELAY = 'retryPassDelay'  # in seconds, before the retry pass
+
+    # default values of common config, used to fill missing fields of old configs
+    DEFAULT_COMM = {
+        CONF_SKIP_EXISTING: False,
+        CONF_RECONCILE: False,
+        CONF_MULTI_THREAD: False,
+        CONF_MAX_WORKERS: 1,
+        CONF_RESOLVE_WORKERS: 4,
+        CONF_RANK_WORKERS: 4,
+        CONF_ADAPTIVE: False,
+        CONF_MIN_WORKERS: 1,
+        CONF_ASYNC: False,
+        CONF_ASYNC_LIMIT: 100,
+        CONF_CACHE_TTL: 7,
+        CONF_BATCH_SIZE: 1,
+        CONF_RETRY_TRIALS: 3,
+        CONF_RETRY_BACKOFF: 0.5,
+        CONF_RETRY_BUDGET: 100,
+        CONF_SESSION_TTL: 8,
+        CONF_WARM_UP: True,
+        CONF_RETRY_PASS: True,
+        CONF_RETRY_PASS_DELAY: 5
+    }
 
     # json files
     FILE_JSON_BANK_MAP = 'assets/json/bank_map.json'
     FILE_JSON_BANK_RANK = 'assets/json/bank_rank.json'
+    FILE_JSON_BANK_CACHE = 'assets/json/bank_cache.json'
+    FILE_JSON_SNAPSHOT = 'assets/json/snapshot.json'
+    FILE_JSON_JOURNAL = 'assets/json/journal.jsonl'
+    FILE_JSON_SESSION = 'assets/json/session.json'
     FILE_JSON_URL_RULE = 'assets/json/url.json'
     FILE_JSON_USER_CONF = 'assets/json/user.json'
 
+    # output dirs
+    DIR_REPORT = 'assets/report'
+
     # ui files
     FILE_UI_MAIN = 'assets/ui/main.ui'
     FILE_UI_JUMP = 'assets/ui/jump.ui'
@@ -1,5 +1,9 @@
+import glob
 import json
 import os
+from functools import lru_cache
+from string import ascii_letters
+from typing import Iterator, Union
 
 from util.const import Const
 
@@ -25,53 +29,121 @@ class JsonUtil:
             return json.load(f)
 
     @staticmethod
-    def convert(src: str, dst: str, division: list[list[int]]) -> None:
-        ''' @return None\n
+    def convert(src: str, dst: str, division: list[list[int]]) -> str:
+        ''' @return str - data info of the saved json\n
         Convert and re-arrange data stored in txt to json format.
-        Using `bank_map.json` to correct some special bank names.
-        Use no keyboard input.
+        Using `bank_map.json` to correct some special bank names, then `BankNameIndex`
+        to correct other misread names to known ones.
+        Use no keyboard input. Lines are validated while they are streamed from `src`.
         '''
+        from util.names import BankNameIndex
+        from util.offers import OfferRow, OfferTable
+
         def simple_preprocess(bank_name: str) -> str:
             bank_name = bank_name.strip('l|')
             if bank_name.endswith('千'): bank_name = bank_name[:-1] + '行'
             return bank_name
 
-        # read lines as a list
+        def columns() -> Iterator[int]:
+            # column of each item, in original layout
+            for rg in range(4):  # 4 rank groups
+                nums, j = list(division[rg]), 0
+                while sum(nums) > 0:
+                    if nums[j] > 0:
+                        yield j
+                        nums[j] -= 1
+                    j = (j + 1) % 5
+
+        bank_map = JsonUtil.load(Const.FILE_JSON_BANK_MAP) or {}
+        index = BankNameIndex.load()
+        data1, cols, left, bank, n = [[] for _ in range(5)], columns(), 0, None, -1
         with open(src, 'r', encoding='utf-8') as f:
-            raw = [line for line in f.read().split('\n') if line]
-        assert len(raw) & 1 == 0, 'Number of data rows is NOT even'
-        bank_map = JsonUtil.load(Const.FILE_JSON_BANK_MAP)
-        # rearrange, in original layout
-        data1, raw_n = [[] for _ in range(5)], 0
-        for rg in range(4):  # 4 rank groups
-            nums, j = division[rg], 0
-            while sum(nums) > 0:
-                if nums[j] > 0:
+            for line in f:
+                line = line.rstrip('\n')
+                if not line: continue
+                n += 1
+                if bank is None:
+                    assert not ValidateUtil.NAME_FORBIDDEN.intersection(line), \
+                        f'Expected a bank name at significant line {n}, but got {line}'
+                    bank = simple_preprocess(line)
+                    continue
+                assert ValidateUtil.OFFER_CHARS.issuperset(line), \
+                    f'Expected a offer value at significant line {n}, but got {line}'
+                j = next(cols, None)
+                if j is None:
+                    left += 1
+                else:
                     # some bank names need to be replaced
-                    recog = simple_preprocess(raw[raw_n])
-                    bank = recog if recog not in bank_map else bank_map[recog]
-                    value = raw[raw_n + 1].rstrip('0%')
-                    data1[j].append((bank, value))
-                    nums[j] -= 1
-                    raw_n += 2
-                j = (j + 1) % 5
-        assert raw_n == len(raw), f'{(len(raw)-raw_n)>>1} items left not processed'
-        # from list to dict, by bank name
+                    data1[j].append((index.correct(bank_map.get(bank, bank)), line.rstrip('0%')))
+                bank = None
+        assert bank is None, 'Number of data rows is NOT even'
+        assert left == 0, f'{left} items left not processed'
+        missing = sum(1 for _ in cols)
+        assert missing == 0, f'{missing} items expected by division but not found'
+        # by bank name, from columns to rows
         data2 = dict()
         for i, col in enumerate(data1):
             for bank, value in col:
                 data2.setdefault(bank, [''] * 5)[i] = value
-        # from dict to list, for saving
-        data3 = []
-        for key in data2:
-            data3.append([key, *data2[key]])
-        # save it
-        JsonUtil.save(dst, data3)
+        table = OfferTable(OfferRow(key, values) for key, values in data2.items())
+        table.save(dst)
+        return f'{len(table)} bank(s), {table.count()} offer(s)'
+
+    @staticmethod
+    def convert_batch(sources: list[str], divisions: Union[list, dict], dst_dir: str = '',
+                      workers: int = None) -> dict:
+        ''' @return dict - summary of `succeeded` and `failed` files\n
+        Convert many txt files in parallel processes, see `convert`.
+        Each of `sources` is a txt file, a directory (all txt files in it) or a glob pattern.
+        `divisions` is a division for all files, or a dict from file name to its division,
+        where key `*` is the default. `a.txt` is saved as `a.json` into `dst_dir`, or beside
+        `a.txt` if `dst_dir` is empty.
+        '''
+        from concurrent.futures import ProcessPoolExecutor
+
+        files = []
+        for source in sources:
+            if os.path.isdir(source):
+                found = sorted(glob.glob(os.path.join(source, '*.txt')))
+            elif glob.has_magic(source):
+                found = sorted(glob.glob(source))
+            else:
+                found = [source]
+            files.extend(x for x in found if x not in files)
+        if dst_dir: os.makedirs(dst_dir, exist_ok=True)
+        summary = {'succeeded': [], 'failed': []}
+        jobs = {}
+        with ProcessPoolExecutor(max(1, min(workers or os.cpu_count(), len(files)))) as pool:
+            for src in files:
+                name = os.path.basename(src)
+                division = divisions if isinstance(divisions, list) else divisions.get(name, divisions.get('*'))
+                if division is None:
+                    summary['failed'].append({'src': src, 'error': 'No division is given for it'})
+                    continue
+                dst = os.path.join(dst_dir or os.path.dirname(src), os.path.splitext(name)[0] + '.json')
+                jobs[src] = (dst, pool.submit(JsonUtil.convert, src, dst, division))
+            for src, (dst, future) in jobs.items():
+                try:
+                    summary['succeeded'].append({'src': src, 'dst': dst, 'msg': future.result()})
+                except Exception as ex:
+                    summary['failed'].append({'src': src, 'error': ex.__str__() or ex.__class__.__name__})
+        return summary
 
 
 class ValidateUtil:
     ''' An utility class for file validation checks.
     '''
+    OFFER_CHARS = frozenset('1234567890.%')  # chars used and only used in offer values
+    NAME_FORBIDDEN = OFFER_CHARS.union(ascii_letters)  # should not appear in bank names
+
+    @staticmethod
+    @lru_cache(maxsize=1 << 16)
+    def check_line(line: str) -> tuple[bool, bool]:
+        ''' @return tuple[bool, bool] - (may be a bank name, may be an offer value)\n
+        Cached by line, so re-validating mostly unchanged content is cheap.
+        '''
+        return not ValidateUtil.NAME_FORBIDDEN.intersection(line), ValidateUtil.OFFER_CHARS.issuperset(line)
+
     @staticmethod
     def validate_txt(txt_path: str = '', content: list[str] = []) -> tuple[bool, str]:
         ''' @return tuple[bool, str] - (is_valid, description)\n
@@ -88,13 +160,11 @@ class ValidateUtil:
                 content = [x for x in f.read().split('\n') if x]
         if len(content) & 1 != 0:
             return False, 'Number of lines must be even'
-        char_set1 = set('1234567890.%')  # chars used and only used in offer values
-        char_set2 = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')  # should not appear
         for i in range(0, len(content), 2):  # bank names
-            if set(content[i]).intersection(char_set1.union(char_set2)):
+            if not ValidateUtil.check_line(content[i])[0]:
                 return False, f'Expected a bank name at significant line {i}, but got {content[i]}'
         for i in range(1, len(content), 2):  # offer values
-            if not set(content[i]).issubset(char_set1):
+            if not ValidateUtil.check_line(content[i])[1]:
                 return False, f'Expected a offer value at significant line {i}, but got {content[i]}'
         return True, f'Found {len(content)>>1} offers'
 
@@ -104,25 +174,12 @@ class ValidateUtil:
         Returned description may be error message if is_valid is `False`;
         Or it is data info that parsed from the json file.
         '''
+        from util.offers import OfferTable
         try:
-            content = JsonUtil.load(json_path)
-        except json.JSONDecodeError as ex:
+            table = OfferTable.load(json_path)
+        except ValueError as ex:  # json.JSONDecodeError as well
             return False, ex.__str__()
-        if not isinstance(content, list):
-            return False, f'Expected type list[list[str]] of json, not {content.__class__}'
-        count = 0
-        for i, elem in enumerate(content, 1):
-            if not isinstance(elem, list):
-                return False, f'Expected type list[str] at {i}th element, not {elem.__class__}'
-            if len(elem) != 6:
-                return False, f'Expected length 6 of {i}th element, but got {len(elem)}'
-            if elem[0] == '':
-                return False, f'Expected a bank name at {i}th element, but got an empty string'
-            for j in range(6):
-                if not isinstance(elem[j], str):
-                    return False, f'Expected type str of all values in {i}th element, not {elem[j].__class__}'
-                if j > 0 and elem[j]: count += 1
-        return True, f'{len(content)} bank(s), {count} offer(s)'
+        return True, f'{len(table)} bank(s), {table.count()} offer(s)'
 
 
 if __name__ == '__main__':
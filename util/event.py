@@ -0,0 +1,53 @@
+from threading import Lock
+from typing import Callable
+
+
+class Event:
+    ''' A plain replacement of Qt `Signal`, so that core classes do not depend on Qt.
+    Callbacks are called synchronously, in the thread that emits.
+    '''
+    def __init__(self) -> None:
+        self.callbacks: list[Callable] = []
+
+    def connect(self, callback: Callable) -> None:
+        self.callbacks.append(callback)
+
+    def disconnect(self, callback: Callable = None) -> None:
+        ''' @return None\n
+        Disconnect `callback`, or all callbacks if it is not given.
+        '''
+        if callback is None:
+            self.callbacks.clear()
+        elif callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def emit(self, *args) -> None:
+        for callback in list(self.callbacks):
+            callback(*args)
+
+
+class EventBuffer:
+    ''' Collect items emitted from any thread, so that a consumer takes them in one go
+    (e.g. on a timer) rather than handling each of them. Connect `put` to an `Event`.
+    If `latest`, only the last item is kept, like a progress value.
+    '''
+    def __init__(self, latest: bool = False) -> None:
+        self.latest = latest
+        self.lock = Lock()
+        self.items: list = []
+
+    def put(self, item: object) -> None:
+        with self.lock:
+            if self.latest: self.items.clear()
+            self.items.append(item)
+
+    def take(self) -> list:
+        ''' @return list - items put since the last call, in order
+        '''
+        with self.lock:
+            items, self.items = self.items, []
+        return items
+
+
+if __name__ == '__main__':
+    pass
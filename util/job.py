@@ -0,0 +1,70 @@
+from typing import Union
+
+from util.offers import OfferRow, OfferTable
+from util.snapshot import OfferSnapshot
+
+
+class SubmitFailure:
+    ''' A bank whose offers failed to be submitted. `error` is the class of the
+    request exception, or `Invalid` (rejected locally) or `Rejected` (by server).
+    Request exceptions are `retryable`, e.g. timeouts, the others fail again as they are.
+    '''
+    __slots__ = ('bank', 'error', 'msg', 'retryable')
+
+    def __init__(self, bank: OfferRow, error: str, msg: str, retryable: bool = False) -> None:
+        self.bank = bank
+        self.error = error
+        self.msg = msg
+        self.retryable = retryable
+
+    @property
+    def terms(self) -> list[int]:
+        ''' @return list[int] - terms (1~5, as `issueTermNcd`) of the failed offer values
+        '''
+        return [i for i, val in enumerate(self.bank.values, 1) if val]
+
+    def to_dict(self) -> dict:
+        return {'bank': self.bank.to_list(), 'terms': self.terms, 'error': self.error,
+                'msg': self.msg, 'retryable': self.retryable}
+
+    def __str__(self) -> str:
+        return f'{str(self.bank)}: {self.msg}'
+
+    def __repr__(self) -> str:
+        return str(self.to_dict())
+
+
+class SubmitJob:
+    ''' Offers of one json file to submit for one notice date. Many jobs share
+    the workers and connections of one run, see `RequestUtil.add_jobs`.
+    '''
+    def __init__(self, banks: Union[OfferTable, list[list[str]]], notice_date: int, src: str = '') -> None:
+        self.banks = banks if isinstance(banks, OfferTable) else OfferTable.parse(banks)
+        self.notice_date = notice_date
+        self.src = src
+        self.total = 0  # banks left to submit after prune
+        self.done = 0
+        self.failed: list[SubmitFailure] = []
+
+    def percent(self) -> int:
+        ''' @return int - progress of this job, 0~100
+        '''
+        return int(100 * self.done / self.total) if self.total else 100
+
+    def to_dict(self) -> dict:
+        ''' @return dict - `file`, `noticeDate` and `total` of the job, as in journal and report
+        '''
+        return {'file': self.src, 'noticeDate': self.notice_date, 'total': self.total}
+
+    def failed_table(self) -> OfferTable:
+        ''' @return OfferTable - rows of failed banks, to be saved and submitted again
+        '''
+        return OfferTable(failure.bank for failure in self.failed)
+
+    def __repr__(self) -> str:
+        date = OfferSnapshot.date_key(self.notice_date) if self.notice_date is not None else None
+        return f'[{self.src}] @ {date}'
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,85 @@
+import json
+import os
+from threading import Lock
+
+from util.const import Const
+
+
+class SubmitJournal:
+    ''' An append-only journal of one submission run, one json object per line.
+    The first line records jobs of the run (file and notice date of each), then one
+    line per finished bank with the index of its job, and a last line when the run ends.
+    Used to resume an interrupted run.
+    '''
+    def __init__(self, path: str = Const.FILE_JSON_JOURNAL) -> None:
+        self.path = path
+        self.lock = Lock()
+        self.file = None
+
+    def begin(self, jobs: list[dict], resume: bool = False) -> None:
+        ''' @return None\n
+        Start a new journal of `jobs` (see `SubmitJob.to_dict`), or keep appending
+        to the current one if `resume`.
+        '''
+        with self.lock:
+            self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+            if resume: self.file.write('\n')  # in case the last line is torn
+        self.__write({'type': 'resume' if resume else 'begin', 'jobs': jobs})
+
+    def record(self, bank: list[str], resp: str, ok: bool, job: int = 0) -> None:
+        ''' @return None\n
+        Record the outcome of one bank of the `job`th job, flushed at once to survive crashes.
+        `bank` is named as in the source file, so that a resumed run can skip it there.
+        '''
+        self.__write({'type': 'bank', 'job': job, 'bank': bank, 'msg': resp, 'ok': ok})
+
+    def end(self) -> None:
+        ''' @return None\n
+        Mark the run as finished, nothing is left to resume then.
+        '''
+        self.__write({'type': 'end'})
+        self.close()
+
+    def close(self) -> None:
+        ''' @return None\n
+        Close the journal without marking the run as finished, e.g. when it is interrupted.
+        '''
+        with self.lock:
+            if self.file: self.file.close()
+            self.file = None
+
+    def pending(self) -> list[dict]:
+        ''' @return list[dict] - `file`, `noticeDate` and names of `done` banks of each job
+        of an unfinished run, or `None` if the last run is finished or there is no journal
+        '''
+        if not os.path.exists(self.path): return None
+        info, order = None, []  # (file, notice date) -> job, keys of jobs by index in the latest (re)start
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # blank or torn line of a crashed run
+                if item['type'] == 'begin': info = {}
+                if item['type'] in ('begin', 'resume') and info is not None:
+                    order = []
+                    for job in item.get('jobs', [item]):  # a journal of one file has no `jobs`
+                        key = (job['file'], job['noticeDate'])
+                        info.setdefault(key, {'file': job['file'], 'noticeDate': job['noticeDate'], 'done': set()})
+                        order.append(key)
+                elif item['type'] == 'bank' and item['ok'] and info is not None:
+                    info[order[item.get('job', 0)]]['done'].add(item['bank'][0])
+                elif item['type'] == 'end':
+                    info = None
+        return list(info.values()) if info else None
+
+    # helpers
+    def __write(self, item: dict) -> None:
+        with self.lock:
+            if not self.file: return
+            self.file.write(json.dumps(item, ensure_ascii=False) + '\n')
+            self.file.flush()
+
+
+if __name__ == '__main__':
+    pass
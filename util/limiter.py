@@ -0,0 +1,89 @@
+from threading import Condition
+from typing import Callable
+
+
+class AdaptiveLimiter:
+    ''' An AIMD controller of in-flight requests of one endpoint.
+    The limit grows by 1 per window of fast successes, and is halved on
+    timeouts, errors or latency well above the best one observed
+    (twice of it plus `slack` seconds). It always stays in range [`lower`, `upper`].
+    `on_change` is called on decreases, and on increases of 25% or up to `upper`.
+    Slots are taken with `acquire` in threads, or with `acquire_async` in an event loop.
+    '''
+    def __init__(self, name: str, lower: int, upper: int,
+                 on_change: Callable[[str, int], None] = None, slack: float = 0.05) -> None:
+        self.name = name
+        self.slack = slack
+        self.lower = max(1, min(lower, upper))
+        self.upper = max(1, upper)
+        self.limit = float(max(self.lower, self.upper >> 1))
+        self.on_change = on_change
+        self.reported = int(self.limit)
+        self.in_flight = 0
+        self.latency = None  # moving average
+        self.baseline = None  # best moving average so far
+        self.cooldown = 0  # completions to ignore before next decrease
+        self.cond = Condition()
+        self.loop = None  # event loop of `acquire_async`, each run of the async engine has a new one
+        self.freed = None  # set in `loop` when a slot is released
+
+    def acquire(self) -> None:
+        ''' @return None\n
+        Block until the number of in-flight requests is below the limit.
+        '''
+        with self.cond:
+            while not self.__try_acquire():
+                self.cond.wait()
+
+    async def acquire_async(self) -> None:
+        ''' @return None\n
+        Wait in the running event loop until the number of in-flight requests is below the limit.
+        '''
+        import asyncio  # only used by the async engine, not worth its import time elsewhere
+        loop = asyncio.get_running_loop()
+        with self.cond:
+            if self.loop is not loop: self.loop, self.freed = loop, asyncio.Event()
+        while not self.try_acquire():
+            self.freed.clear()
+            await self.freed.wait()
+
+    def try_acquire(self) -> bool:
+        ''' @return bool - `True` if a slot is taken, never blocks
+        '''
+        with self.cond:
+            return self.__try_acquire()
+
+    def release(self, latency: float, ok: bool) -> None:
+        ''' @return None\n
+        Record one finished request, `ok` is `False` on timeouts and errors.
+        '''
+        with self.cond:
+            self.in_flight -= 1
+            if ok:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.baseline = self.latency if self.baseline is None else min(self.baseline, self.latency)
+            if self.cooldown > 0:
+                self.cooldown -= 1
+            elif not ok or self.latency > 2 * self.baseline + self.slack:
+                self.limit = max(self.lower, self.limit / 2)
+                self.cooldown = int(self.limit) + self.in_flight  # requests sent before the decrease
+            else:
+                self.limit = min(self.upper, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+            limit = int(self.limit)
+            report = limit < self.reported or limit >= max(1.25 * self.reported, self.reported + 1) \
+                or limit == self.upper != self.reported
+            if report: self.reported = limit
+            loop, freed = self.loop, self.freed
+        if freed is not None and not loop.is_closed(): loop.call_soon_threadsafe(freed.set)
+        if report and self.on_change: self.on_change(self.name, limit)
+
+    # helpers
+    def __try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit): return False
+        self.in_flight += 1
+        return True
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,101 @@
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator
+
+from util.data import JsonUtil
+
+
+class RunMetrics:
+    ''' Thread-safe counters of one submission run: requests, bytes, retries and latency
+    histograms per endpoint, durations of phases, busy time of stages and queue waits.
+    '''
+    BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]  # upper bounds of histogram buckets
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.started = time.time()
+        self.endpoints: dict[str, dict] = {}
+        self.phases: dict[str, float] = {}
+        self.stages: dict[str, dict] = {}
+        self.notes: dict[str, object] = {}
+
+    def request(self, endpoint: str, latency: float, sent: int, received: int, ok: bool) -> None:
+        ''' @return None\n
+        Record one HTTP request (one trial), `latency` in seconds.
+        '''
+        ms = 1000 * latency
+        bucket = next((i for i, bound in enumerate(self.BOUNDS_MS) if ms <= bound), len(self.BOUNDS_MS))
+        with self.lock:
+            stat = self.__endpoint(endpoint)
+            stat['requests'] += 1
+            stat['errors'] += 0 if ok else 1
+            stat['bytesSent'] += sent
+            stat['bytesReceived'] += received
+            stat['latencySumMs'] += ms
+            stat['latencyMaxMs'] = max(stat['latencyMaxMs'], ms)
+            stat['histogram'][bucket] += 1
+
+    def retry(self, endpoint: str) -> None:
+        with self.lock:
+            self.__endpoint(endpoint)['retries'] += 1
+
+    def stage(self, name: str, busy: float, wait: float = 0, count: int = 1) -> None:
+        ''' @return None\n
+        Record time spent in a stage and time its items waited in the queue, in seconds.
+        '''
+        with self.lock:
+            stat = self.stages.setdefault(name, {'items': 0, 'busySec': 0.0, 'queueWaitSec': 0.0})
+            stat['items'] += count
+            stat['busySec'] += busy
+            stat['queueWaitSec'] += wait
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        ''' Measure wall time of a phase, like `with metrics.phase('login'): ...`
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def note(self, key: str, value: object) -> None:
+        with self.lock:
+            self.notes[key] = value
+
+    def report(self) -> dict:
+        ''' @return dict - everything recorded so far, json serializable
+        '''
+        with self.lock:
+            endpoints = {}
+            for name, stat in self.endpoints.items():
+                stat = dict(stat)
+                stat['latencyAvgMs'] = stat['latencySumMs'] / stat['requests'] if stat['requests'] else 0.0
+                stat['histogram'] = dict(zip([f'<={b}ms' for b in self.BOUNDS_MS] + ['>5000ms'], stat['histogram']))
+                endpoints[name] = stat
+            return {
+                'startedAt': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+                'elapsedSec': time.time() - self.started,
+                **self.notes,
+                'phasesSec': dict(self.phases),
+                'stages': {k: dict(v) for k, v in self.stages.items()},
+                'endpoints': endpoints
+            }
+
+    def save(self, filename: str) -> None:
+        JsonUtil.save(filename, self.report(), False)
+
+    # helpers
+    def __endpoint(self, name: str) -> dict:
+        if name not in self.endpoints:
+            self.endpoints[name] = {
+                'requests': 0, 'errors': 0, 'retries': 0, 'bytesSent': 0, 'bytesReceived': 0,
+                'latencySumMs': 0.0, 'latencyMaxMs': 0.0, 'histogram': [0] * (len(self.BOUNDS_MS) + 1)
+            }
+        return self.endpoints[name]
+
+
+if __name__ == '__main__':
+    pass
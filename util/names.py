@@ -0,0 +1,72 @@
+from collections import defaultdict
+from typing import Iterable
+
+from util.const import Const
+from util.data import JsonUtil
+
+
+class BankNameIndex:
+    ''' A local index of known institution names, used to correct OCR errors in
+    bank names before any request. A name is only corrected by substituting chars that
+    OCR is known to confuse (learned from `bank_map.json`), never by any other edit, as
+    names one char apart are often different issuers (e.g. 常州农商银行 and 苏州农商银行).
+    Candidates are found through a key of each name with confusable chars folded together.
+    '''
+    CONFUSED = {('千', '行')}  # (misread, right), also applied by `JsonUtil.convert`
+
+    def __init__(self, names: Iterable[str] = (), confused: Iterable[tuple[str, str]] = ()) -> None:
+        self.names: set[str] = set()
+        self.keys: dict[str, set[str]] = defaultdict(set)  # name with confusable chars folded -> names
+        self.confused = self.CONFUSED.union(confused)
+        self.folds: dict[str, str] = {}  # char -> representative of the chars it is confused with
+        for wrong, right in sorted(self.confused):
+            group = {wrong, right}
+            group.update(c for c, rep in self.folds.items() if rep in (self.folds.get(wrong), self.folds.get(right)))
+            rep = min(group)
+            for c in group:
+                self.folds[c] = rep
+        for name in names:
+            self.add(name)
+
+    @staticmethod
+    def load() -> 'BankNameIndex':
+        ''' @return BankNameIndex - index of names in the bank cache (all of them, even
+        if expired, a name does not expire), `bank_map.json` and `bank_rank.json`
+        '''
+        names, confused = set(), set()
+        cache = JsonUtil.load(Const.FILE_JSON_BANK_CACHE)
+        if isinstance(cache, dict): names.update(cache.get('id', {}))
+        for wrong, right in (JsonUtil.load(Const.FILE_JSON_BANK_MAP) or {}).items():
+            names.add(right)
+            diff = [(a, b) for a, b in zip(wrong, right) if a != b] if len(wrong) == len(right) else []
+            if len(diff) == 1: confused.update(diff)  # a single misread char
+        names.update(JsonUtil.load(Const.FILE_JSON_BANK_RANK) or {})
+        return BankNameIndex(names, confused)
+
+    def add(self, name: str) -> None:
+        if not name or name in self.names: return
+        self.names.add(name)
+        self.keys[self.__key(name)].add(name)
+
+    def correct(self, name: str) -> str:
+        ''' @return str - the known name `name` stands for if it differs only in misread chars
+        (each a known confused pair), or `name` itself if it is known, no such name exists,
+        or more than one does
+        '''
+        if not name or name in self.names: return name
+        candidates = [known for known in self.keys.get(self.__key(name), ()) if self.__is_misread(name, known)]
+        return candidates[0] if len(candidates) == 1 else name
+
+    # helpers
+    def __key(self, name: str) -> str:
+        return ''.join(self.folds.get(c, c) for c in name)
+
+    def __is_misread(self, src: str, dst: str) -> bool:
+        ''' @return bool - `True` if each char of `src` (as read) that differs from `dst`
+        (a known name) is a known misreading of the char in `dst`
+        '''
+        return len(src) == len(dst) and all(a == b or (a, b) in self.confused for a, b in zip(src, dst))
+
+
+if __name__ == '__main__':
+    pass
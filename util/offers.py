@@ -0,0 +1,115 @@
+from typing import Iterable, Iterator
+
+
+class OfferRow:
+    ''' Offers of one bank, values of 5 terms (1M, 3M, 6M, 9M, 1Y) as text and as yields.
+    An empty value has yield `None`. Values are kept as text to be submitted as they are.
+    `source` is the name as in the source file, `name` may be corrected later.
+    '''
+    __slots__ = ('name', 'source', 'values', 'yields')
+
+    def __init__(self, name: str, values: Iterable[str]) -> None:
+        self.name = name
+        self.source = name
+        self.values = list(values)
+        self.yields = [float(val) if val else None for val in self.values]
+
+    def count(self) -> int:
+        ''' @return int - number of non-empty offer values
+        '''
+        return sum(1 for val in self.values if val)
+
+    def drop(self, term: int) -> None:
+        ''' @return None\n
+        Clear the offer value of `term` (0~4).
+        '''
+        self.values[term] = ''
+        self.yields[term] = None
+
+    def to_list(self) -> list[str]:
+        ''' @return list[str] - the row in json layout, `[name, v1, v2, v3, v4, v5]`
+        '''
+        return [self.name, *self.values]
+
+    def __repr__(self) -> str:
+        return str(self.to_list())
+
+
+class OfferTable:
+    ''' Offers of many banks, parsed once from the json layout `list[list[str]]`.
+    '''
+    def __init__(self, rows: Iterable[OfferRow] = ()) -> None:
+        self.rows = list(rows)
+
+    @staticmethod
+    def parse(content: object) -> 'OfferTable':
+        ''' @return OfferTable - rows of `content` in json layout\n
+        Raise `ValueError` describing the first malformed element.
+        '''
+        if not isinstance(content, list):
+            raise ValueError(f'Expected type list[list[str]] of json, not {content.__class__}')
+        rows = []
+        for i, elem in enumerate(content, 1):
+            if not isinstance(elem, list):
+                raise ValueError(f'Expected type list[str] at {i}th element, not {elem.__class__}')
+            if len(elem) != 6:
+                raise ValueError(f'Expected length 6 of {i}th element, but got {len(elem)}')
+            if elem[0] == '':
+                raise ValueError(f'Expected a bank name at {i}th element, but got an empty string')
+            for val in elem:
+                if not isinstance(val, str):
+                    raise ValueError(f'Expected type str of all values in {i}th element, not {val.__class__}')
+            try:
+                rows.append(OfferRow(elem[0], elem[1:]))
+            except ValueError:
+                raise ValueError(f'Expected numbers as offer values in {i}th element, but got {elem[1:]}') from None
+        return OfferTable(rows)
+
+    @staticmethod
+    def load(filename: str) -> 'OfferTable':
+        ''' @return OfferTable - rows of a converted json file, see `parse`
+        '''
+        from util.data import JsonUtil
+        return OfferTable.parse(JsonUtil.load(filename))
+
+    def save(self, filename: str) -> None:
+        from util.data import JsonUtil
+        JsonUtil.save(filename, self.to_lists())
+
+    def to_lists(self) -> list[list[str]]:
+        return [row.to_list() for row in self.rows]
+
+    def count(self) -> int:
+        ''' @return int - number of non-empty offer values of all rows
+        '''
+        return sum(row.count() for row in self.rows)
+
+    def prune(self, exists: dict[str, list[str]]) -> int:
+        ''' @return int - number of offer values dropped\n
+        Drop offer values equal to existing ones (by yield, so `2.1` equals `2.10`),
+        then rows without any offer value. Different values are kept to overwrite.
+        '''
+        existing = set()
+        for name, values in exists.items():
+            for term, val in enumerate(values):
+                try:
+                    if val: existing.add((name, term, float(val)))
+                except ValueError:
+                    pass  # not comparable, never matches
+        dropped = 0
+        for row in self.rows:
+            for term in [t for t, y in enumerate(row.yields) if (row.name, t, y) in existing]:
+                row.drop(term)
+                dropped += 1
+        self.rows = [row for row in self.rows if row.count()]
+        return dropped
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[OfferRow]:
+        return iter(self.rows)
+
+
+if __name__ == '__main__':
+    pass
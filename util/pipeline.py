@@ -0,0 +1,103 @@
+import time
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Callable, Iterable, Iterator
+
+
+class Pipeline:
+    ''' Run items through stages connected by bounded queues.
+    Each stage has its own workers, so a slow stage does not hold back the others.
+    '''
+    class Failure:
+        ''' Wrap an exception raised by a stage, it is re-raised by `run`.
+        '''
+        def __init__(self, ex: Exception) -> None:
+            self.ex = ex
+
+    END = object()  # sentinel, closes a queue
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self.stages: list[tuple[Callable, int, int, float]] = []
+        self.stats: list[dict] = []  # per stage: items, seconds busy and seconds items waited in queue
+        self.lock = Lock()
+
+    def add_stage(self, func: Callable, workers: int = 1, batch: int = 1, linger: float = 0.05) -> 'Pipeline':
+        ''' @return Pipeline - self, to chain calls\n
+        `func` maps an item to an item. If `batch` > 1, it maps a list of at most
+        `batch` items to a list of items instead, a worker waits up to `linger`
+        seconds for a batch to fill.
+        '''
+        self.stages.append((func, max(1, workers), max(1, batch), linger))
+        self.stats.append({'items': 0, 'busy': 0.0, 'wait': 0.0})
+        return self
+
+    def run(self, items: Iterable) -> Iterator:
+        ''' @return Iterator - items out of the last stage, in order of completion
+        '''
+        queues = [Queue(max(self.maxsize, 2 * workers * batch)) for _, workers, batch, _ in self.stages] + [Queue()]
+        Thread(target=self.__feed, args=(items, queues[0]), daemon=True).start()
+        for i, (func, workers, batch, linger) in enumerate(self.stages):
+            alive = [workers, Lock()]
+            for _ in range(workers):
+                args = (func, batch, linger, queues[i], queues[i + 1], alive, self.stats[i])
+                Thread(target=self.__work, args=args, daemon=True).start()
+        while True:
+            item = queues[-1].get()
+            if item is Pipeline.END: return
+            if isinstance(item[1], Pipeline.Failure): raise item[1].ex
+            yield item[1]
+
+    # helpers
+    def __feed(self, items: Iterable, dst: Queue) -> None:
+        for item in items:
+            dst.put((time.perf_counter(), item))
+        dst.put(Pipeline.END)
+
+    def __work(self, func: Callable, batch: int, linger: float, src: Queue, dst: Queue, alive: list, stat: dict) -> None:
+        while True:
+            items, closed = self.__take(src, batch, linger, stat)
+            for failure in [item for item in items if isinstance(item, Pipeline.Failure)]:
+                dst.put((time.perf_counter(), failure))
+            items = [item for item in items if not isinstance(item, Pipeline.Failure)]
+            start = time.perf_counter()
+            try:
+                if batch > 1 and items:
+                    results = func(items)
+                elif items:
+                    results = [func(items[0])]
+            except Exception as ex:
+                results = [Pipeline.Failure(ex)]
+            if items:
+                with self.lock:
+                    stat['items'] += len(items)
+                    stat['busy'] += time.perf_counter() - start
+                for result in results:
+                    dst.put((time.perf_counter(), result))
+            if closed: break
+        src.put(Pipeline.END)  # let sibling workers see it
+        with alive[1]:
+            alive[0] -= 1
+            if alive[0] == 0: dst.put(Pipeline.END)
+
+    def __take(self, src: Queue, batch: int, linger: float, stat: dict) -> tuple[list, bool]:
+        ''' @return tuple[list, bool] - (items, whether the queue is closed)
+        '''
+        items, closed, wait = [], False, 0.0
+        while len(items) < batch:
+            try:
+                item = src.get(timeout=linger) if items else src.get()
+            except Empty:
+                break
+            if item is Pipeline.END:
+                closed = True
+                break
+            wait += time.perf_counter() - item[0]
+            items.append(item[1])
+        with self.lock:
+            stat['wait'] += wait
+        return items, closed
+
+
+if __name__ == '__main__':
+    pass
@@ -1,102 +1,513 @@
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
-from typing import Iterator
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+from json import dumps, loads
+from typing import Callable, Union
 from uuid import uuid4
 
 import requests as rq
-from PySide2.QtCore import QObject, Signal
+from requests.adapters import HTTPAdapter
 
+from util.cache import BankCache
 from util.const import Const
 from util.data import JsonUtil
+from util.event import Event
+from util.job import SubmitFailure, SubmitJob
+from util.journal import SubmitJournal
+from util.limiter import AdaptiveLimiter
+from util.metrics import RunMetrics
+from util.names import BankNameIndex
+from util.offers import OfferRow, OfferTable
+from util.pipeline import Pipeline
+from util.retry import RetryPolicy
+from util.snapshot import OfferSnapshot
 
+asyncio = None  # imported with aiohttp on first use of the async engine, see `__import_async`
+aiohttp = None  # optional, only required by the async engine
 
-class RequestUtil(QObject):
+
+class RequestUtil:
     ''' Auto submit table data.
+    Free of Qt, logs and progress are sent through events `new_log` (str), `cur_percent` (int)
+    and `job_progress` (int, int), see `add_jobs`.
+    Meant to live as long as the app, call `start_run` before each run to pick up changed config.
     '''
-    new_log = Signal(str)
-    cur_percent = Signal(int)
-
-    def __init__(self) -> None:
-        super().__init__()
-        self.conf = JsonUtil.load(Const.FILE_JSON_URL_RULE)
-        self.user, self.comm = JsonUtil.load(Const.FILE_JSON_USER_CONF)
-        self.rmap = JsonUtil.load(Const.FILE_JSON_BANK_RANK)
+    class AuthExpired(rq.exceptions.RequestException):
+        ''' The session id is rejected by server, login is required again.
+        '''
+
+    def __init__(self, user_conf: str = Const.FILE_JSON_USER_CONF) -> None:
+        self.new_log = Event()
+        self.cur_percent = Event()
+        self.job_progress = Event()
+        self.user_conf = user_conf
+        self.mtimes: dict[str, int] = dict()  # path -> mtime of loaded files, see `reload`
         self.session_id = uuid4().__str__()
+        self.login_lock = Lock()
+        self.session: rq.Session = None
+        self.pool_size = 0
+        self.journal = SubmitJournal()
+        self.limiters: dict[str, AdaptiveLimiter] = dict()
+        self.metrics = RunMetrics()
+        self.warm_lock = Lock()
+        self.prefetched: set[str] = set()  # notice dates (see `OfferSnapshot.date_key`) fetched by `warm_up`
+        self.reload()
+
+    def reload(self) -> list[str]:
+        ''' @return list[str] - config files that are (re)loaded\n
+        Load files changed on disk (by mtime) since they were loaded, including edits by
+        other windows or tools. Warm state survives: session, pooled connections, and
+        cached ids, ranks and offers unless their own files changed.
+        '''
+        watched = [Const.FILE_JSON_URL_RULE, self.user_conf, Const.FILE_JSON_BANK_RANK,
+                   Const.FILE_JSON_BANK_CACHE, Const.FILE_JSON_SNAPSHOT]
+        mtimes = {path: self.__mtime(path) for path in watched}
+        changed = [path for path in watched if mtimes[path] != self.mtimes.get(path, -1)]
+        if Const.FILE_JSON_URL_RULE in changed:
+            self.conf = JsonUtil.load(Const.FILE_JSON_URL_RULE)
+            self.urls = dict()
+            self.endpoints = {v: k for k, v in self.conf.items()}  # url suffix -> endpoint name
+        if self.user_conf in changed:
+            self.user, comm = JsonUtil.load(self.user_conf)
+            self.comm = {**Const.DEFAULT_COMM, **comm}
+            self.retry = RetryPolicy(
+                self.comm[Const.CONF_RETRY_TRIALS], self.comm[Const.CONF_RETRY_BACKOFF], self.comm[Const.CONF_RETRY_BUDGET])
+        if Const.FILE_JSON_BANK_RANK in changed:
+            self.rmap = JsonUtil.load(Const.FILE_JSON_BANK_RANK)
+        if Const.FILE_JSON_BANK_CACHE in changed or self.user_conf in changed:
+            self.cache = BankCache(self.comm[Const.CONF_CACHE_TTL])
+        if Const.FILE_JSON_SNAPSHOT in changed:
+            self.snapshot = OfferSnapshot()
+        if Const.FILE_JSON_URL_RULE in changed or self.user_conf in changed:
+            self.__update_session()
+        if Const.FILE_JSON_URL_RULE in changed or self.user_conf in changed or Const.FILE_JSON_SNAPSHOT in changed:
+            with self.warm_lock:
+                self.prefetched.clear()  # fetched from another server or lost with the old snapshot
+        self.mtimes = mtimes  # only after all loads succeed, so a broken file is tried again next time
+        return [path for path in changed if path not in watched[3:]]
+
+    def start_run(self) -> None:
+        ''' @return None\n
+        Begin a new run: reload changed config and start fresh metrics.
+        '''
+        changed = self.reload()
+        if changed: self.__send_logs(f'Reloaded changed config {changed}')
+        self.metrics = RunMetrics()
 
-    def login(self) -> str:
+    @staticmethod
+    def make_notice_date(days_ago: int = 0) -> int:
+        ''' @return int - notice date in milliseconds, `days_ago` days before now
+        '''
+        return 1000 * (int(time.time()) - 86400 * days_ago)
+
+    def save_report(self, src: str = '', notice_date: int = None) -> str:
+        ''' @return str - path of the machine-readable report of this run\n
+        Save metrics of this run as a json file under `assets/report`.
+        '''
+        self.metrics.note('file', src)
+        self.metrics.note('noticeDate', notice_date)
+        os.makedirs(Const.DIR_REPORT, exist_ok=True)
+        path = os.path.join(Const.DIR_REPORT, time.strftime('run_%Y%m%d_%H%M%S.json'))
+        self.metrics.save(path)
+        return path
+
+    def login(self, force: bool = False) -> str:
         ''' @return str - error msg if any\n
-        Login to get session id.
+        Login to get session id. Unless `force`, a session id saved by an earlier login
+        (of the same user and server, within `sessionTTL` hours) is reused instead,
+        if server rejects it later, `__post` logs in again on demand.
         '''
+        if not force and self.__restore_session(): return ''
         self.__send_logs('\nTry to login...')
         try:
-            resp = self.__post(self.conf['login'], self.user, timeout=10)
+            with self.metrics.phase('login'):
+                resp = self.__post(self.conf['login'], self.user, timeout=10)
             if resp['status'] != '0': raise rq.exceptions.ConnectionError(resp['msg'])
-        except rq.exceptions.RequestException as ex:
+        except (rq.exceptions.RequestException, ValueError) as ex:
             self.__send_logs(' ! Process terminated\n')
             return f'FAILED to login: {ex.__str__()}'
         self.session_id = resp['data']['sessionId']
+        self.session.headers['lid'] = self.session_id
+        JsonUtil.save(Const.FILE_JSON_SESSION, {
+            'sessionId': self.session_id,
+            'issuedAt': time.time(),
+            'loginName': self.user[Const.CONF_USERNAME],
+            'origin': self.conf['Origin']
+        })
         self.__send_logs(f'Received session id [{self.session_id}] from server')
         return ''
 
-    def add_offers(self, banks: list[list[str]], notice_date: int = None) -> list[list[str]]:
-        ''' @return list[list[str]] - list of failed offers\n
-        Add all offers and return failed ones.
+    def warm_up(self, jobs: list[SubmitJob], cancelled: Callable[[], bool]) -> bool:
+        ''' @return bool - `True` if it runs to the end, not disabled, failed to login or cancelled\n
+        Do ahead what a run of `jobs` starts with, e.g. while the user is still to press start:
+        login, fetch offers on server of their notice dates (if `skipExisting`), and resolve
+        ids and ranks of their banks into the bank cache. Stop early once `cancelled()` is true.
+        Fetched offers spare the next run fetching them again, unless another warm-up starts first.
         '''
+        if not self.comm[Const.CONF_WARM_UP] or cancelled(): return False
+        self.discard_warm_up()
+        if self.login() or cancelled(): return False
 
-        # exec one complete data submit operation
-        def do_full_submit(bank: list[str]) -> tuple[list[str], str]:
+        # fetch offers on server, merged into snapshot as `__prune` does
+        for notice_date in {OfferSnapshot.date_key(job.notice_date): job.notice_date for job in jobs}.values():
+            if not self.comm[Const.CONF_SKIP_EXISTING] or cancelled(): break
             try:
-                bank_id = self.__get_bank_id(bank[0])
-                bank_rank = self.__get_rank_by_id(bank_id)
-                resp = self.__submit_one_offer(bank_id, bank_rank, bank, notice_date)
-            except rq.exceptions.Timeout:
-                resp = '请求超时'
-            return bank, resp
-
-        # push all tasks into a thread pool
-        def push_to_thread_pool(banks: list[list[str]], max_workers: int = 1) -> Iterator[Future]:
-            executor = ThreadPoolExecutor(max_workers=max_workers)
-            all_tasks = [executor.submit(do_full_submit, bank) for bank in banks]
-            return as_completed(all_tasks)
+                exists, complete = self.__get_existing_set(notice_date)
+            except (rq.exceptions.RequestException, ValueError) as ex:
+                self.__send_logs(' ! FAILED to fetch existing offers:', ex.__str__())
+                continue
+            with self.warm_lock:
+                if cancelled(): return False  # a newer warm-up may have started
+                self.snapshot.merge(notice_date, exists, complete)
+                self.prefetched.add(OfferSnapshot.date_key(notice_date))
 
-        # try to skip existing offers
-        if self.comm[Const.CONF_SKIP_EXISTING]:
-            self.__send_logs('\nPruning offer set...')
+        # resolve ids and ranks of banks, errors are left for the run to report
+        def do_resolve(name: str) -> str:
+            try:
+                return None if cancelled() else self.__get_bank_id(name)
+            except (rq.exceptions.RequestException, ValueError):
+                return None
+
+        def do_rank(bank_id: str) -> str:
+            try:
+                return None if cancelled() else self.__get_rank_by_id(bank_id)
+            except (rq.exceptions.RequestException, ValueError):
+                return None
+
+        index = BankNameIndex.load()
+        names = {index.correct(bank.name) for job in jobs for bank in job.banks}
+        self.__send_logs(f'Warming up {len(names)} bank(s)...')
+        pipeline = Pipeline()
+        pipeline.add_stage(do_resolve, self.__workers(Const.CONF_RESOLVE_WORKERS))
+        pipeline.add_stage(do_rank, self.__workers(Const.CONF_RANK_WORKERS))
+        ranked = sum(1 for rank in pipeline.run(name for name in names if not cancelled()) if rank)
+        self.cache.save()
+        if cancelled(): return False
+        self.__send_logs(f'Warmed up, {ranked} of {len(names)} bank(s) resolved')
+        return True
+
+    def discard_warm_up(self) -> None:
+        ''' @return None\n
+        Forget offers fetched by `warm_up`, e.g. once it is cancelled for another file or date.
+        Resolved ids and ranks are kept, they do not depend on the file or date.
+        '''
+        with self.warm_lock:
+            self.prefetched.clear()
+
+    def add_offers(self, banks: Union[OfferTable, list[list[str]]], notice_date: int = None,
+                   src: str = '', resume: bool = False) -> list[SubmitFailure]:
+        ''' @return list[SubmitFailure] - list of failed offers\n
+        Add all offers of one file as a single job and return failed ones, see `add_jobs`.
+        Rows in json layout are parsed into an `OfferTable` first.
+        '''
+        job = SubmitJob(banks, notice_date, src)
+        self.add_jobs([job], resume)
+        return job.failed
+
+    def add_jobs(self, jobs: list[SubmitJob], resume: bool = False) -> None:
+        ''' @return None\n
+        Add all offers of all jobs in one run, failed ones are kept in `failed` of each job.
+        Banks of all jobs stream through the same workers and connections, in order of jobs,
+        so a job starts while the last banks of the previous one are still in flight.
+        Progress of each job is sent through event `job_progress` (int index, int percent).
+        Banks failed for retryable errors are tried once more after `retryPassDelay` seconds,
+        at half the concurrency, as long as the retry budget lasts (one retry per bank).
+        Those failed again are saved as a json file, see `save_failed`.
+        Outcomes are journaled with jobs, pass `resume` to keep appending to the journal of an interrupted run.
+        '''
+
+        # stage 1: resolve institution id of a bank
+        def do_resolve(task: dict) -> dict:
+            try:
+                task['id'] = self.__get_bank_id(task['bank'].name)
+            except (rq.exceptions.RequestException, ValueError) as ex:
+                task['resp'], task['error'] = self.__describe(ex), ex
+            return task
+
+        # stage 2: get rank by id, then build offers
+        def do_rank(task: dict) -> dict:
+            if task['resp']: return task
+            try:
+                bank_rank = self.__get_rank_by_id(task['id'])
+            except (rq.exceptions.RequestException, ValueError) as ex:
+                task['resp'], task['error'] = self.__describe(ex), ex
+                return task
+            task['offers'], task['resp'] = self.__make_offers(task['id'], bank_rank, task['bank'])
+            if task['resp']: task['error'] = 'Invalid'
+            return task
+
+        # stage 3: submit offers of one bank
+        def do_submit(task: dict) -> dict:
+            if task['resp']: return task
             try:
-                exists = self.__get_existing_set(notice_date)
-            except rq.exceptions.Timeout as ex:
-                self.__send_logs(' ! FAILED to exec prune:', ex.__str__())
-                self.__send_logs(' ! SKIPPED...')
+                task['resp'] = self.__submit_offers(task['offers'], task['job'].notice_date)
+            except (rq.exceptions.RequestException, ValueError) as ex:
+                task['resp'], task['error'] = self.__describe(ex), ex
             else:
-                for i in range(len(banks) - 1, -1, -1):
-                    if banks[i][0] not in exists: continue
-                    exist = exists[banks[i][0]]
-                    for j in range(5):
-                        if not banks[i][j + 1] or not exist[j]: continue
-                        if banks[i][j + 1] == exist[j]: banks[i][j + 1] = ''
-                        # pass (!=) to overwrite different offers
-                    if not any(banks[i][1:]): banks.pop(i)  # remove banks with 5 empty offer-values
-                self.__send_logs('COMPLETE')
+                if task['resp'] != '新增报价成功':
+                    task['error'] = 'Rejected'
+                    self.cache.invalidate(task['bank'].name)  # re-resolve it next time
+            return task
+
+        # stage 3 in batch mode: submit offers of many banks of the same notice date in one request,
+        # fall back to one by one if it is not a clear success
+        def do_batch_submit(tasks: list[dict]) -> list[dict]:
+            groups: dict[int, list[dict]] = {}
+            for task in tasks:
+                if not task['resp']: groups.setdefault(task['job'].notice_date, []).append(task)
+            for notice_date, batch in groups.items():
+                if len(batch) < 2:
+                    do_submit(batch[0])
+                    continue
+                try:
+                    resp = self.__submit_offers([offer for task in batch for offer in task['offers']], notice_date)
+                except (rq.exceptions.RequestException, ValueError) as ex:
+                    resp = self.__describe(ex)
+                for task in batch:
+                    if resp == '新增报价成功':
+                        task['resp'] = resp
+                    else:
+                        do_submit(task)
+            return tasks
+
+        # correct misread bank names locally, before any request
+        self.__correct_names(jobs)
+
+        # try to skip existing offers
+        if self.comm[Const.CONF_SKIP_EXISTING]:
+            with self.metrics.phase('prune'):
+                self.__prune(jobs)
 
         # traverse and submit
-        max_workers = self.comm[Const.CONF_MAX_WORKERS] if self.comm[Const.CONF_MULTI_THREAD] else 1
-        all_count = len(banks)
-        self.__send_logs(f'\nStart to add {all_count} offers...')
-        failed = []
-
-        all_tasks = push_to_thread_pool(banks, max_workers)
-        for i, done in enumerate(all_tasks, 1):
-            bank, resp = done.result()
-            self.cur_percent.emit(int(100 * i / all_count))
-            if resp != '新增报价成功':
-                failed.append(f'{str(bank)}: {resp}')
+        for job in jobs:
+            job.total, job.done, job.failed = len(job.banks), 0, []
+        all_count = sum(job.total for job in jobs)
+        self.__send_logs(f'\nStart to add {all_count} offers of {len(jobs)} job(s)...')
+        self.retry.reset()
+        index = {id(job): i for i, job in enumerate(jobs)}
+        retry_pass = self.comm[Const.CONF_RETRY_PASS]
+
+        # collect result of one bank, `error` is a request exception, or the class of a rejection
+        def report(job: SubmitJob, bank: OfferRow, resp: str, error: Union[Exception, str] = None) -> None:
+            ok = resp == '新增报价成功'
+            if not ok and isinstance(error, Exception) and retry_pass:
+                retried.append((job, bank, resp, error))  # not done yet, tried again in the retry pass
+                return
+            count[0] += 1
+            job.done += 1
+            self.cur_percent.emit(int(100 * count[0] / all_count))
+            self.job_progress.emit(index[id(job)], job.percent())
+            self.journal.record([bank.source, *bank.values], resp, ok, index[id(job)])
+            if not ok:
+                retryable = isinstance(error, Exception)
+                kind = error.__class__.__name__ if retryable else error or 'Rejected'
+                job.failed.append(SubmitFailure(bank, kind, resp, retryable))
+            else:
+                self.snapshot.record(job.notice_date, bank.to_list())
+                self.new_log.emit(f'{bank.name} - SUCCESS')
+            if job.done == job.total and len(jobs) > 1:
+                self.__send_logs(f'Job {index[id(job)] + 1} {job} is done, {len(job.failed)} fail(s)')
+
+        # run banks through the engine, with `scale` of the configured concurrency
+        def run_pass(banks: list[tuple[SubmitJob, OfferRow]], scale: float) -> None:
+            self.limiters = self.__make_limiters(scale)  # or AIMD grows back to the full ceiling
+            if use_async:
+                with self.metrics.phase('submit'):
+                    asyncio.run(self.__add_offers_async(banks, report, scale))
+                return
+            # stream banks through resolve -> rank -> submit, each stage has its own workers
+            batch_size = self.comm[Const.CONF_BATCH_SIZE]
+            pipeline = Pipeline()
+            pipeline.add_stage(do_resolve, self.__workers(Const.CONF_RESOLVE_WORKERS, scale))
+            pipeline.add_stage(do_rank, self.__workers(Const.CONF_RANK_WORKERS, scale))
+            if batch_size > 1:
+                pipeline.add_stage(do_batch_submit, self.__workers(Const.CONF_MAX_WORKERS, scale), batch_size)
             else:
-                self.new_log.emit(f'{bank[0]} - SUCCESS')
-        return failed
+                pipeline.add_stage(do_submit, self.__workers(Const.CONF_MAX_WORKERS, scale))
+            tasks = ({'job': job, 'bank': bank, 'id': None, 'offers': [], 'resp': '', 'error': None}
+                     for job, bank in banks)
+            with self.metrics.phase('submit'):
+                for task in pipeline.run(tasks):
+                    report(task['job'], task['bank'], task['resp'], task['error'])
+            for name, stat in zip(['resolve', 'rank', 'submit'], pipeline.stats):
+                self.metrics.stage(name, stat['busy'], stat['wait'], stat['items'])
+
+        count, retried = [0], []
+        use_async = self.comm[Const.CONF_ASYNC]
+        if use_async and not self.__import_async():
+            self.__send_logs(' ! aiohttp is not installed, fall back to thread pool')
+            use_async = False
+        self.metrics.note('engine', 'async' if use_async else 'thread')
+        self.journal.begin([job.to_dict() for job in jobs], resume)
+        try:
+            run_pass([(job, bank) for job in jobs for bank in job.banks], 1)
+            if retried:
+                # transient errors (timeouts, 5xx...) may be gone after a while, with less load,
+                # each bank is charged to the retry budget, those beyond it fail fast as they are
+                granted, retry_pass = 0, False
+                while granted < len(retried) and self.retry.spend():
+                    granted += 1
+                banks, skipped, retried = [(job, bank) for job, bank, _, _ in retried[:granted]], retried[granted:], []
+                if skipped:
+                    self.__send_logs(f'\nRetry budget exhausted, {len(skipped)} bank(s) failed for retryable errors')
+                    for job, bank, resp, error in skipped:
+                        report(job, bank, resp, error)
+                if banks:
+                    delay = self.comm[Const.CONF_RETRY_PASS_DELAY]
+                    self.__send_logs(f'\n{len(banks)} bank(s) failed for retryable errors, try again in {delay}s...')
+                    time.sleep(delay)
+                    run_pass(banks, 0.5)
+                self.metrics.note('retriedBanks', len(banks))
+            self.journal.end()
+        finally:
+            self.journal.close()  # an interrupted run is left unfinished in the journal, to be resumed
+            self.limiters = dict()
+        with self.warm_lock:
+            self.prefetched.clear()  # used up, the next run fetches again
+        self.cache.save()
+        self.snapshot.save()
+        budget = f'{self.retry.left} left' if self.retry.left > 0 else 'exhausted'
+        self.__send_logs(f'Retried {self.retry.count} request(s), retry budget {budget}')
+        for job in jobs:
+            if job.failed: self.__send_logs(f'Failed offers of {job} are saved into [{self.save_failed(job)}]')
+        self.metrics.note('banks', all_count)
+        self.metrics.note('failed', sum(len(job.failed) for job in jobs))
+        self.metrics.note('failures', [failure.to_dict() for job in jobs for failure in job.failed])
+        self.metrics.note('retries', self.retry.count)
+        if len(jobs) > 1:
+            self.metrics.note('jobs', [{**job.to_dict(), 'failed': len(job.failed)} for job in jobs])
+
+    def save_failed(self, job: SubmitJob) -> str:
+        ''' @return str - path of failed banks of `job`, a json file of offers\n
+        Save rows of failed banks under `assets/report`, it can be selected or submitted
+        like any converted json file, so that a re-run only touches these rows.
+        '''
+        os.makedirs(Const.DIR_REPORT, exist_ok=True)
+        name = os.path.splitext(os.path.basename(job.src))[0] or 'offers'
+        date = OfferSnapshot.date_key(job.notice_date) if job.notice_date is not None else 'today'
+        path = os.path.join(Const.DIR_REPORT, f'failed_{name}_{date}_{time.strftime("%H%M%S")}.json')
+        job.failed_table().save(path)
+        return path
 
-    def __get_existing_set(self, notice_date: int) -> dict[str, list[str]]:
-        ''' @return dict[str, list[str]] - dict of existing offers\n
-        Pull info of all existing offers and convert it into a dict.
+    def __correct_names(self, jobs: list[SubmitJob]) -> None:
+        ''' @return None\n
+        Correct bank names in place to known names, see `BankNameIndex`.
         '''
+        index, count = BankNameIndex.load(), 0
+        for bank in (bank for job in jobs for bank in job.banks):
+            name = index.correct(bank.name)
+            if name == bank.name: continue
+            self.__send_logs(f'Corrected bank name {bank.name} -> {name}')
+            bank.name = name
+            count += 1
+        self.metrics.note('corrected', count)
+
+    def __prune(self, jobs: list[SubmitJob]) -> None:
+        ''' @return None\n
+        Skip existing offers in place, using local snapshot and optionally offers on server.
+        Offers on server are fetched once per notice date, however many jobs share it,
+        and not at all if `warm_up` has fetched them.
+        '''
+        self.__send_logs('\nPruning offer set...')
+        with self.warm_lock:
+            fetched = set(self.prefetched)
+        for job in jobs:
+            exists = self.snapshot.get(job.notice_date)
+            date_key = OfferSnapshot.date_key(job.notice_date)
+            if (self.comm[Const.CONF_RECONCILE] or not exists) and date_key not in fetched:
+                fetched.add(date_key)
+                try:
+                    self.snapshot.merge(job.notice_date, *self.__get_existing_set(job.notice_date))
+                except (rq.exceptions.RequestException, ValueError) as ex:
+                    self.__send_logs(' ! FAILED to fetch existing offers:', ex.__str__())
+                    self.__send_logs(' ! Prune with local snapshot only...')
+                else:
+                    exists = self.snapshot.get(job.notice_date)
+            dropped = job.banks.prune(exists)  # different offers are kept to overwrite
+            self.__send_logs(f'COMPLETE, {dropped} existing offer(s) of {job} skipped')
+
+    async def __add_offers_async(self, banks: list[tuple[SubmitJob, OfferRow]], report: Callable,
+                                 scale: float = 1) -> None:
+        ''' @return None\n
+        Same as the thread pool path of `add_jobs`, but all requests are driven by one event loop.
+        At most `asyncLimit` (times `scale`) requests are in flight, per endpoint if adaptive concurrency
+        is enabled, `report` is called once per bank with its job, response and error.
+        '''
+        limit = max(1, int(scale * self.comm[Const.CONF_ASYNC_LIMIT]))
+        if self.limiters: limit = sum(limiter.upper for limiter in self.limiters.values())  # limited by each
+        self.async_gate = asyncio.Semaphore(limit)  # so that queued requests do not eat their timeouts
+        connector = aiohttp.TCPConnector(limit=limit)
+        async with aiohttp.ClientSession(connector=connector, headers=dict(self.session.headers)) as client:
+
+            async def do_resolve(job: SubmitJob, bank: OfferRow) -> tuple[SubmitJob, OfferRow, list[dict], str, object]:
+                try:
+                    bank_id = await self.__get_bank_id_async(client, bank.name)
+                    bank_rank = await self.__get_rank_by_id_async(client, bank_id)
+                except (asyncio.TimeoutError, aiohttp.ClientError, ValueError, RequestUtil.AuthExpired) as ex:
+                    return job, bank, [], self.__describe(ex), ex
+                offers, resp = self.__make_offers(bank_id, bank_rank, bank)
+                return job, bank, offers, resp, 'Invalid' if resp else None
+
+            async def do_submit(job: SubmitJob, bank: OfferRow,
+                                offers: list[dict]) -> tuple[SubmitJob, OfferRow, str, object]:
+                try:
+                    resp = await self.__submit_offers_async(client, offers, job.notice_date)
+                except (asyncio.TimeoutError, aiohttp.ClientError, ValueError, RequestUtil.AuthExpired) as ex:
+                    return job, bank, self.__describe(ex), ex
+                if resp == '新增报价成功': return job, bank, resp, None
+                self.cache.invalidate(bank.name)  # re-resolve it next time
+                return job, bank, resp, 'Rejected'
+
+            async def do_full_submit(job: SubmitJob, bank: OfferRow) -> list[tuple[SubmitJob, OfferRow, str, object]]:
+                job, bank, offers, resp, error = await do_resolve(job, bank)
+                return [(job, bank, resp, error) if resp else await do_submit(job, bank, offers)]
+
+            async def do_batch_submit(batch: list[tuple[SubmitJob, OfferRow, list[dict]]]) -> list[tuple]:
+                try:
+                    offers = [offer for _, _, offers in batch for offer in offers]
+                    resp = await self.__submit_offers_async(client, offers, batch[0][0].notice_date)
+                except (asyncio.TimeoutError, aiohttp.ClientError, ValueError, RequestUtil.AuthExpired) as ex:
+                    resp = self.__describe(ex)
+                if resp == '新增报价成功': return [(job, bank, resp, None) for job, bank, _ in batch]
+                return [await do_submit(job, bank, offers) for job, bank, offers in batch]
+
+            batch_size = self.comm[Const.CONF_BATCH_SIZE]
+            if batch_size > 1:
+                batches, pending = [], dict()  # notice date -> batch being filled, a batch has one notice date
+                for done in asyncio.as_completed([do_resolve(job, bank) for job, bank in banks]):
+                    job, bank, offers, resp, error = await done
+                    if resp:
+                        report(job, bank, resp, error)
+                        continue
+                    batch = pending.setdefault(job.notice_date, [])
+                    batch.append((job, bank, offers))
+                    if len(batch) == batch_size:
+                        batches.append(pending.pop(job.notice_date))
+                batches.extend(pending.values())
+                self.__send_logs(f'Resolved, submit in {len(batches)} batch(es)...')
+                all_tasks = [do_batch_submit(batch) for batch in batches]
+            else:
+                all_tasks = [do_full_submit(job, bank) for job, bank in banks]
+            for done in asyncio.as_completed(all_tasks):
+                for job, bank, resp, error in await done:
+                    report(job, bank, resp, error)
+
+    def __get_existing_set(self, notice_date: int) -> tuple[dict[str, list[str]], bool]:
+        ''' @return tuple[dict[str, list[str]], bool] - dict of existing offers, and `True` if
+        all of them are pulled (`False` if some parts failed)\n
+        Pull info of all existing offers and convert it into a dict. Offers are pulled in parts,
+        one per rank, concurrently (up to the size of the connection pool), each part is merged
+        once it arrives. A part is filtered by `sbjRtg`, taking a rank name of `Const.RANKS` as
+        in the `sbjRtg` field of the response groups, not the index code of `issuerCredit`.
+        Failed parts are logged and skipped, so most banks are still covered, the last exception
+        is raised only if all parts fail. Empty parts are not trusted as an empty offer set (the
+        filter may not match on server): if some parts failed, the fetch fails; if none, offers
+        are pulled again in one unfiltered request.
+        '''
+        def fetch(rank: str) -> dict:
+            return self.__post(self.conf['offerList'], {**payload, 'sbjRtg': rank}, timeout=5)
+
         payload = {
             'orgIssuerId': '',
             'noticeDate': notice_date,
@@ -109,35 +520,92 @@ class RequestUtil(QObject):
             'nonBankSign': '',
             'openSign': ''
         }
-        resp = self.__post(self.conf['offerList'], payload, timeout=5)
-        offer_dict = {}
+        offer_dict, failed, error = {}, [], None
+        with ThreadPoolExecutor(max(1, min(len(Const.RANKS), self.pool_size))) as pool:
+            parts = {pool.submit(fetch, rank): rank for rank in Const.RANKS}
+            for part in as_completed(parts):
+                try:
+                    resp = part.result()
+                    self.__merge_existing(offer_dict, resp)
+                except (rq.exceptions.RequestException, ValueError) as ex:
+                    failed.append(parts[part])
+                    error = ex
+        if len(failed) == len(Const.RANKS): raise error
+        if not offer_dict:
+            if failed: raise ValueError(f'no offer in parts of rank other than {", ".join(sorted(failed))}: {error}')
+            self.__merge_existing(offer_dict, fetch(''))
+            return offer_dict, True
+        if failed: self.__send_logs(f' ! FAILED to fetch existing offers of rank {", ".join(sorted(failed))}: {error}')
+        return offer_dict, not failed
+
+    def __merge_existing(self, offer_dict: dict[str, list[str]], resp: dict) -> None:
+        ''' @return None\n
+        Merge offers of an offerList response into `offer_dict`, by bank name.
+        '''
         for rg in resp['data']:
             for i, item in enumerate(rg['sbjRtgList']):
                 for offer in item['offerDtlList']:
-                    offer_dict.setdefault(offer['organizationShortName'], ['' for _ in range(5)])[i] = offer['refYield']
-        return offer_dict
+                    values = offer_dict.get(offer['organizationShortName'])
+                    if values is None: values = offer_dict[offer['organizationShortName']] = [''] * 5
+                    values[i] = offer['refYield']
 
     def __get_bank_id(self, bank_name: str) -> str:
         ''' @return str - institution id of the bank\n
         An empty id means the bank has no id yet; `None` means cannot find
         a bank that exactly match the given string `bank_name`.
+        Cached ids are used first, see `BankCache`.
         '''
+        bank_id = self.cache.get_id(bank_name)
+        if bank_id is not None: return bank_id
         payload = {'enqrVal': bank_name, 'pageNum': 1, 'pageSize': 10}
         resp = self.__post(self.conf['fuzzyQuery'], payload, timeout=5)
+        return self.__pick_bank_id(bank_name, resp)
+
+    def __pick_bank_id(self, bank_name: str, resp: dict) -> str:
+        ''' @return str - institution id of the bank found in a fuzzyQuery response
+        '''
+        bank_id = None
         for bank in resp['data']['list']:
-            if bank['organizationShortName'] == bank_name:
-                return bank.setdefault('issuerId', '')
-        return None
+            # other names listed are exact names as well, cache them for `BankNameIndex`
+            self.cache.set_id(bank['organizationShortName'], bank.setdefault('issuerId', ''))
+            if bank['organizationShortName'] == bank_name: bank_id = bank['issuerId']
+        return bank_id
 
     def __get_rank_by_id(self, bank_id: str) -> str:
-        ''' @return str - corresponding rank of the institution id
+        ''' @return str - corresponding rank of the institution id\n
+        Cached ranks are used first, see `BankCache`.
         '''
+        if not bank_id: return ''  # nothing to query, offer will be rejected locally
+        bank_rank = self.cache.get_rank(bank_id)
+        if bank_rank is not None: return bank_rank
         payload = {'institutionId': bank_id}
         resp = self.__post(self.conf['getRankById'], payload, timeout=5)
+        self.cache.set_rank(bank_id, resp['data'])
         return resp['data']
 
-    def __submit_one_offer(self, bank_id: str, bank_rank: str, bank: list[str], notice_date: int) -> str:
-        ''' @return str - message of this offer-submitting operation\n
+    async def __get_bank_id_async(self, client: 'aiohttp.ClientSession', bank_name: str) -> str:
+        ''' @return str - same as `__get_bank_id`
+        '''
+        bank_id = self.cache.get_id(bank_name)
+        if bank_id is not None: return bank_id
+        payload = {'enqrVal': bank_name, 'pageNum': 1, 'pageSize': 10}
+        resp = await self.__post_async(client, self.conf['fuzzyQuery'], payload, timeout=5)
+        return self.__pick_bank_id(bank_name, resp)
+
+    async def __get_rank_by_id_async(self, client: 'aiohttp.ClientSession', bank_id: str) -> str:
+        ''' @return str - same as `__get_rank_by_id`
+        '''
+        if not bank_id: return ''
+        bank_rank = self.cache.get_rank(bank_id)
+        if bank_rank is not None: return bank_rank
+        payload = {'institutionId': bank_id}
+        resp = await self.__post_async(client, self.conf['getRankById'], payload, timeout=5)
+        self.cache.set_rank(bank_id, resp['data'])
+        return resp['data']
+
+    def __make_offers(self, bank_id: str, bank_rank: str, bank: OfferRow) -> tuple[list[dict], str]:
+        ''' @return tuple[list[dict], str] - (offers, error msg if any)\n
+        Build entries of `offerDtlList` for all non-empty offer values of a bank.
         '''
         template = {
             'issueTermNcd': '',  # duration 1~5: 1M, 3M, 6M, 9M, 1Y
@@ -147,42 +615,187 @@ class RequestUtil(QObject):
             'openSign': 0,
             'refYieldBulletin': '',  # offer value
             'issuerId': bank_id,
-            'issuerCredit': str(['', 'AAA', 'AA+', 'AA', 'AA-', 'A+', 'A', 'A-', 'BBB+'].index(bank_rank))
+            'issuerCredit': str(['', *Const.RANKS].index(bank_rank))
         }
         # check validation
-        if template['issuerId'] is None: return '未找到该银行（要求名称精确匹配）'
-        if template['issuerId'] == '': return '无发行机构 ID'
-        if template['issuerCredit'] == '0': template['issuerCredit'] = self.rmap.setdefault(bank[0], '0')
-        if template['issuerCredit'] == '0': return '无评级信息'
-        # construct payload and submit it
-        payload = {'noticeDate': notice_date, 'offerDtlList': []}
-        for i, val in enumerate(bank[1:], 1):
+        if template['issuerId'] is None: return [], '未找到该银行（要求名称精确匹配）'
+        if template['issuerId'] == '': return [], '无发行机构 ID'
+        # banks without rank are looked up in `bank_rank.json`, their empty ranks are cached as well
+        if template['issuerCredit'] == '0': template['issuerCredit'] = self.rmap.setdefault(bank.name, '0')
+        if template['issuerCredit'] == '0': return [], '无评级信息'
+        # construct offers
+        offers = []
+        for i, val in enumerate(bank.values, 1):
             if not val: continue
             offer = template.copy()
             offer['issueTermNcd'] = str(i)
             offer['refYieldBulletin'] = val
-            payload['offerDtlList'].append(offer)
+            offers.append(offer)
+        return offers, ''
+
+    def __submit_offers(self, offers: list[dict], notice_date: int) -> str:
+        ''' @return str - message of this offer-submitting operation\n
+        Offers may come from different banks, each of them carries its own `issuerId`.
+        '''
+        payload = {'noticeDate': notice_date, 'offerDtlList': offers}
         resp = self.__post(self.conf['addOffer'], payload, timeout=5)
         return resp['msg']
 
+    async def __submit_offers_async(self, client: 'aiohttp.ClientSession', offers: list[dict], notice_date: int) -> str:
+        ''' @return str - same as `__submit_offers`
+        '''
+        payload = {'noticeDate': notice_date, 'offerDtlList': offers}
+        resp = await self.__post_async(client, self.conf['addOffer'], payload, timeout=5)
+        return resp['msg']
+
+    def __restore_session(self) -> bool:
+        ''' @return bool - `True` if the saved session id is reused, see `login`
+        '''
+        try:
+            saved = JsonUtil.load(Const.FILE_JSON_SESSION)
+            fresh = time.time() - saved['issuedAt'] < 3600 * self.comm[Const.CONF_SESSION_TTL]
+            if not fresh or saved['loginName'] != self.user[Const.CONF_USERNAME]: return False
+            if saved['origin'] != self.conf['Origin']: return False
+        except (ValueError, TypeError, KeyError):
+            return False  # no saved session, or a broken file
+        self.session_id = saved['sessionId']
+        self.session.headers['lid'] = self.session_id
+        self.__send_logs(f'\nReuse session id [{self.session_id}] since {time.ctime(saved["issuedAt"])}')
+        return True
+
+    def __relogin(self, lid: str) -> bool:
+        ''' @return bool - `True` if there is a new session id to replay requests sent with `lid`\n
+        Login again once for all workers that find `lid` expired.
+        '''
+        with self.login_lock:
+            if self.session_id != lid: return True  # renewed by another worker
+            self.__send_logs(' ! Session expired')
+            return not self.login(force=True)
+
+    def __is_expired(self, suffix: str, data: object) -> bool:
+        ''' @return bool - `True` if a json response asks to login again
+        '''
+        return suffix != self.conf['login'] and isinstance(data, dict) and '登录' in str(data.get('msg', ''))
+
     def __post(self, suffix: str, json: dict, **kwargs) -> dict:
+        ''' @return dict - json content of response\n
+        Make a POST request with `__request`, if the session id has expired,
+        login again and replay the request once.
+        '''
+        lid = self.session_id
+        try:
+            return self.__request(suffix, json, **kwargs)
+        except RequestUtil.AuthExpired:
+            if suffix == self.conf['login'] or not self.__relogin(lid): raise
+        return self.__request(suffix, json, **kwargs)
+
+    def __request(self, suffix: str, json: dict, **kwargs) -> dict:
         ''' @return dict - json content of response\n
         A simple wrapper to make a POST request.\n
-        If `timeout` is set, a `requests.exceptions.Timeout` exception may be raised
-        when request keeps timing out and number of retries exceeds `trials`.
+        If `timeout` is set, timeouts, connection errors, 5xx responses and non-json bodies
+        are retried with backoff up to `trials` times while the retry budget lasts (see `RetryPolicy`),
+        then the last exception (a `requests.exceptions.RequestException` or `ValueError`) is raised.
+        `AuthExpired` is raised at once on 401/403 or a json response asking to login.
         '''
         timeout = kwargs.setdefault('timeout', None)
-        trials = kwargs.setdefault('trials', 3) if timeout is not None else 1
+        trials = kwargs.setdefault('trials', self.retry.trials) if timeout is not None else 1
+        url = self.__make_url(suffix)
+        limiter = self.limiters.get(suffix)
+        endpoint = self.endpoints.get(suffix, suffix)
         for i in range(1, 1 + trials):
-            url = self.__make_url(suffix)
+            if limiter: limiter.acquire()
+            start, ok, resp = time.perf_counter(), False, None
             try:
-                resp = rq.post(url, json=json, timeout=timeout, headers=self.__make_header())
-                return resp.json()
-            except rq.exceptions.Timeout:
-                if i == trials: raise
-                continue
+                resp = self.session.post(url, json=json, timeout=timeout)
+                if resp.status_code in (401, 403): raise RequestUtil.AuthExpired(response=resp)
+                if resp.status_code >= 500: resp.raise_for_status()
+                data = resp.json()
+                if self.__is_expired(suffix, data): raise RequestUtil.AuthExpired(response=resp)
+                ok = True
+                return data
+            except (rq.exceptions.Timeout, rq.exceptions.ConnectionError, rq.exceptions.HTTPError, ValueError):
+                if i == trials or not self.retry.spend(): raise
+                self.metrics.retry(endpoint)
+            finally:
+                latency = time.perf_counter() - start
+                if limiter: limiter.release(latency, ok)
+                sent, received = (len(resp.request.body or b''), len(resp.content)) if resp is not None else (0, 0)
+                self.metrics.request(endpoint, latency, sent, received, ok)
+            time.sleep(self.retry.delay(i))
         return None
 
+    async def __post_async(self, client: 'aiohttp.ClientSession', suffix: str, json: dict, **kwargs) -> dict:
+        ''' @return dict - json content of response\n
+        Async version of `__post`, login runs in a thread so that the event loop goes on.
+        '''
+        lid = self.session_id
+        try:
+            return await self.__request_async(client, suffix, json, **kwargs)
+        except RequestUtil.AuthExpired:
+            if not await asyncio.to_thread(self.__relogin, lid): raise
+        return await self.__request_async(client, suffix, json, **kwargs)
+
+    async def __request_async(self, client: 'aiohttp.ClientSession', suffix: str, json: dict, **kwargs) -> dict:
+        ''' @return dict - json content of response\n
+        Async version of `__request`, an `asyncio.TimeoutError`, `aiohttp.ClientError`
+        or `ValueError` is raised instead when retries run out. Only the HTTP exchange is timed as
+        latency, waits for the limiter and the gate are recorded as queue wait of the endpoint.
+        '''
+        timeout = kwargs.setdefault('timeout', None)
+        trials = kwargs.setdefault('trials', self.retry.trials) if timeout is not None else 1
+        url = self.__make_url(suffix)
+        limiter = self.limiters.get(suffix)
+        endpoint = self.endpoints.get(suffix, suffix)
+        body = dumps(json).encode('utf-8')
+        for i in range(1, 1 + trials):
+            queued = time.perf_counter()
+            if limiter: await limiter.acquire_async()
+            start, ok, received = time.perf_counter(), False, 0
+            try:
+                async with self.async_gate:
+                    start = time.perf_counter()  # waiting for the gate is not latency of server
+                    headers = {'lid': self.session_id}  # may be renewed during the run
+                    async with client.post(url, data=body, headers=headers,
+                                           timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                        content = await resp.read()
+                        received = len(content)
+                        if resp.status in (401, 403): raise RequestUtil.AuthExpired()
+                        if resp.status >= 500: resp.raise_for_status()
+                        data = loads(content)
+                        if self.__is_expired(suffix, data): raise RequestUtil.AuthExpired()
+                        ok = True
+                        return data
+            except (asyncio.TimeoutError, aiohttp.ClientError, ValueError):
+                if i == trials or not self.retry.spend(): raise
+                self.metrics.retry(endpoint)
+            finally:
+                latency = time.perf_counter() - start
+                if limiter: limiter.release(latency, ok)
+                self.metrics.request(endpoint, latency, len(body), received, ok)
+                self.metrics.stage(endpoint, latency, start - queued)
+            await asyncio.sleep(self.retry.delay(i))
+        return None
+
+    def __update_session(self) -> None:
+        ''' @return None\n
+        Keep a keep-alive session shared by all workers, and across runs.
+        Connections are pooled and reused, the pool is sized by workers of all stages,
+        it is only replaced if the size changes. Headers are only rebuilt on config changes,
+        `lid` is updated after login.
+        '''
+        if self.session is None: self.session = rq.Session()
+        self.session.headers.clear()
+        self.session.headers.update(self.__make_header())
+        fields = [Const.CONF_RESOLVE_WORKERS, Const.CONF_RANK_WORKERS, Const.CONF_MAX_WORKERS]
+        pool_size = sum(self.__workers(field) for field in fields)
+        if pool_size == self.pool_size: return
+        for old in set(self.session.adapters.values()):
+            old.close()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool_size = pool_size
+
     def __make_header(self) -> dict[str, str]:
         ''' @return dict[str, str] - request headers\n
         Generate headers of request and return it.
@@ -202,13 +815,78 @@ class RequestUtil(QObject):
         }
 
     def __make_url(self, suffix: str) -> str:
-        ''' @return str - join an url
+        ''' @return str - join an url, joined ones are cached
+        '''
+        if suffix not in self.urls: self.urls[suffix] = f'{self.conf["Origin"]}/{suffix}'
+        return self.urls[suffix]
+
+    def __make_limiters(self, scale: float = 1) -> dict[str, AdaptiveLimiter]:
+        ''' @return dict[str, AdaptiveLimiter] - limiters of lookup and submit endpoints\n
+        Concurrency of each endpoint floats between `minWorkers` and the workers of its stage
+        (or `asyncLimit` of the async engine), taken `scale` of the configured.
+        Empty if adaptive concurrency is disabled.
+        '''
+        if not self.comm[Const.CONF_ADAPTIVE]: return dict()
+
+        def log_change(name: str, limit: int) -> None:
+            self.__send_logs(f'Concurrency of [{name}] -> {limit}')
+
+        limiters = dict()
+        lower = self.comm[Const.CONF_MIN_WORKERS]
+        fields = {
+            'fuzzyQuery': Const.CONF_RESOLVE_WORKERS,
+            'getRankById': Const.CONF_RANK_WORKERS,
+            'addOffer': Const.CONF_MAX_WORKERS
+        }
+        for name, field_name in fields.items():
+            if self.comm[Const.CONF_ASYNC]:
+                upper = max(1, int(scale * self.comm[Const.CONF_ASYNC_LIMIT]))
+            else:
+                upper = self.__workers(field_name, scale)
+            limiters[self.conf[name]] = AdaptiveLimiter(name, lower, upper, log_change)
+            log_change(name, int(limiters[self.conf[name]].limit))
+        return limiters
+
+    @staticmethod
+    def __import_async() -> bool:
+        ''' @return bool - `True` if aiohttp is installed
+
+        Import modules of the async engine, they are slow to import and rarely used.
+        '''
+        global asyncio, aiohttp
+        if aiohttp is None:
+            try:
+                import aiohttp
+                import asyncio
+            except ImportError:
+                return False
+        return True
+
+    @staticmethod
+    def __describe(ex: Exception) -> str:
+        ''' @return str - failure message of a request exception
+        '''
+        if isinstance(ex, rq.exceptions.Timeout): return '请求超时'
+        if isinstance(ex, RequestUtil.AuthExpired): return '登录已过期'
+        if asyncio is not None and isinstance(ex, asyncio.TimeoutError): return '请求超时'
+        return f'请求失败（{ex.__class__.__name__}）'
+
+    def __mtime(self, path: str) -> int:
+        ''' @return int - mtime of a file in ns, `None` if it does not exist
+        '''
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def __workers(self, field_name: str, scale: float = 1) -> int:
+        ''' @return int - number of workers of a stage (`scale` of the configured), 1 if multi-thread is disabled
         '''
-        return f'{self.conf["Origin"]}/{suffix}'
+        return max(1, int(scale * self.comm[field_name])) if self.comm[Const.CONF_MULTI_THREAD] else 1
 
     def __send_logs(self, *logs: object) -> None:
         ''' @return None\n
-        Send `logs` outside using signal `new_log`.
+        Send `logs` outside using event `new_log`.
         '''
         self.new_log.emit(' '.join(logs).strip())
 
@@ -0,0 +1,41 @@
+import random
+from threading import Lock
+
+
+class RetryPolicy:
+    ''' Exponential backoff with full jitter, limited by a per-run retry budget.
+    Once the budget is spent, requests are not retried anymore and fail fast.
+    '''
+    def __init__(self, trials: int = 3, backoff: float = 0.5, budget: int = 100, max_delay: float = 8) -> None:
+        self.trials = max(1, trials)
+        self.backoff = backoff
+        self.budget = budget
+        self.max_delay = max_delay
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        ''' @return None\n
+        Refill the budget, called at the beginning of each run.
+        '''
+        with self.lock:
+            self.count = 0
+            self.left = self.budget
+
+    def spend(self) -> bool:
+        ''' @return bool - `True` if one more retry is allowed by the budget
+        '''
+        with self.lock:
+            if self.left <= 0: return False
+            self.left -= 1
+            self.count += 1
+            return True
+
+    def delay(self, attempt: int) -> float:
+        ''' @return float - seconds to wait before retry after `attempt` failed trials
+        '''
+        return random.uniform(0, min(self.max_delay, self.backoff * 2 ** (attempt - 1)))
+
+
+if __name__ == '__main__':
+    pass
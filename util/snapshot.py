@@ -0,0 +1,69 @@
+import time
+from threading import Lock
+
+from util.const import Const
+from util.data import JsonUtil
+
+
+class OfferSnapshot:
+    ''' A local store of accepted offers, keyed by notice date, bank and term.
+    Used to compute the delta of re-runs offline. Only the latest `keep_days`
+    notice dates are kept.
+    '''
+    def __init__(self, path: str = Const.FILE_JSON_SNAPSHOT, keep_days: int = 7) -> None:
+        self.path = path
+        self.keep_days = keep_days
+        self.lock = Lock()
+        self.dirty = False
+        data = JsonUtil.load(path)
+        self.data: dict[str, dict[str, list[str]]] = data if isinstance(data, dict) else {}
+
+    @staticmethod
+    def date_key(notice_date: int) -> str:
+        ''' @return str - local date of a notice date in milliseconds, like `2021-01-31`
+        '''
+        return time.strftime('%Y-%m-%d', time.localtime(notice_date / 1000))
+
+    def get(self, notice_date: int) -> dict[str, list[str]]:
+        ''' @return dict[str, list[str]] - copy of accepted offers of the notice date, by bank name
+        '''
+        with self.lock:
+            return {k: v.copy() for k, v in self.data.get(self.date_key(notice_date), {}).items()}
+
+    def record(self, notice_date: int, bank: list[str]) -> None:
+        ''' @return None\n
+        Record a bank row as accepted, empty offer values do not overwrite recorded ones.
+        '''
+        with self.lock:
+            offers = self.data.setdefault(self.date_key(notice_date), {}).setdefault(bank[0], [''] * 5)
+            for i, val in enumerate(bank[1:]):
+                if val: offers[i] = val
+            self.dirty = True
+
+    def merge(self, notice_date: int, exists: dict[str, list[str]], complete: bool = True) -> None:
+        ''' @return None\n
+        Reconcile with offers pulled from server. If `complete`, they replace recorded ones of
+        the notice date, so that offers deleted on server are not skipped by later runs; else
+        (some were not pulled) they only overwrite recorded ones of the same banks.
+        '''
+        with self.lock:
+            if complete:
+                self.data[self.date_key(notice_date)] = {k: list(v) for k, v in exists.items()}
+            else:
+                self.data.setdefault(self.date_key(notice_date), {}).update((k, list(v)) for k, v in exists.items())
+            self.dirty = True
+
+    def save(self) -> None:
+        ''' @return None\n
+        Write the snapshot back to disk if anything changed, dropping old notice dates.
+        '''
+        with self.lock:
+            if not self.dirty: return
+            for key in sorted(self.data)[:-self.keep_days]:
+                self.data.pop(key)
+            JsonUtil.save(self.path, self.data)
+            self.dirty = False
+
+
+if __name__ == '__main__':
+    pass